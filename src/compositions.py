@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+#
+# Intelligence Artificielle & Jeux
+# Sorbonne Université
+#
+# Ben Kabongo
+# Mars 2022
+#
+
+from math import comb
+
+
+class Compositions:
+    '''
+    Espace des distributions de taille size dont la somme est bornée à limit
+
+    Les distributions sont énumérées à la demande, dans l'ordre
+    lexicographique (le même que celui de strategies.generate_distrib),
+    sans jamais être toutes construites en mémoire. Chaque distribution
+    peut être représentée par son rang dans cet ordre.
+    '''
+
+    def __init__(self, limit, size):
+        '''
+        :param limit (int)
+            borne supérieure de la somme
+        :param size (int)
+            taille des distributions
+        '''
+        self.limit = limit
+        self.size = size
+
+    def __len__(self):
+        return count(self.limit, self.size)
+
+    def __contains__(self, r):
+        return (len(r) == self.size and
+                all(x >= 0 for x in r) and
+                sum(r) <= self.limit)
+
+    def __iter__(self):
+        '''
+        énumère les distributions dans l'ordre lexicographique
+        '''
+        if self.size == 0:
+            yield ()
+            return
+        r = [0] * self.size
+        s = 0
+        while True:
+            yield tuple(r)
+            if s < self.limit:
+                r[-1] += 1
+                s += 1
+                continue
+            # somme maximale atteinte : on remet à zéro le dernier terme
+            # non nul et on incrémente son prédécesseur
+            j = self.size - 1
+            while j > 0 and r[j] == 0:
+                j -= 1
+            if j == 0:
+                return
+            s -= r[j] - 1
+            r[j] = 0
+            r[j-1] += 1
+
+    def rank(self, r):
+        '''
+        :param r (tuple)
+            distribution
+        :return (int)
+            rang de r dans l'ordre d'énumération
+        '''
+        if r not in self:
+            raise ValueError(f'{tuple(r)} n\'est pas une distribution de taille '
+                             f'{self.size} et de somme au plus {self.limit}')
+        index = 0
+        limit = self.limit
+        for i, x in enumerate(r):
+            m = self.size - i - 1
+            # nombre de distributions dont le i-ème terme est < x
+            index += comb(limit + m + 1, m + 1) - comb(limit - x + m + 1, m + 1)
+            limit -= x
+        return index
+
+    def unrank(self, index):
+        '''
+        :param index (int)
+            rang d'une distribution
+        :return (tuple)
+            la distribution de rang index
+        '''
+        n = count(self.limit, self.size)
+        if not 0 <= index < n:
+            raise IndexError(f'rang {index} hors de [0, {n})')
+        r = []
+        limit = self.limit
+        for i in range(self.size):
+            m = self.size - i - 1
+            x = 0
+            while index >= count(limit - x, m):
+                index -= count(limit - x, m)
+                x += 1
+            r.append(x)
+            limit -= x
+        return tuple(r)
+
+
+def count(limit, size):
+    '''
+    :return (int)
+        nombre de distributions de taille size dont la somme est bornée à
+        limit
+    '''
+    if limit < 0:
+        return 0
+    return comb(limit + size, size)
@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+#
+# Intelligence Artificielle & Jeux
+# Sorbonne Université
+#
+# Ben Kabongo
+# Mars 2022
+#
+
+import math
+import numpy as np
+
+
+def manhattan(players_positions, goals_positions):
+    '''
+    :param players_positions (np.array)
+        positions des joueurs, tableau de taille (nb_players, 2)
+    :param goals_positions (np.array)
+        positions des cibles, tableau de taille (nb_goals, 2)
+    :return (np.array)
+        matrice joueurs x cibles des distances de Manhattan
+    '''
+    return np.abs(players_positions[:, None, :] -
+                  goals_positions[None, :, :]).sum(axis=2)
+
+
+class DistanceOracle:
+    '''
+    Distances entre les joueurs d'une équipe et les cibles du jour
+
+    La matrice joueurs x cibles est calculée une seule fois par jour et par
+    équipe ; les cibles accessibles sont dérivées d'un masque booléen et
+    mises en cache par distance minimale. Toutes les stratégies (et
+    sous-stratégies) d'une équipe partagent le même oracle.
+    '''
+
+    def __init__(self, players_ids, matrix):
+        '''
+        :param players_ids (list)
+            identifiants des joueurs de la team
+        :param matrix (np.array)
+            matrice joueurs x cibles des distances
+        '''
+        self.players_ids = list(players_ids)
+        self.matrix = matrix
+        self.nb_goals = matrix.shape[1]
+        self.rows = {j: k for k, j in enumerate(self.players_ids)}
+        # lignes de la matrice par joueur (vues, sans copie)
+        self.distances = {j: matrix[k] for j, k in self.rows.items()}
+        self._accessibles = {}
+        self._accessibles_players = {}
+
+    def get_mask(self, dist_min):
+        '''
+        :return (np.array)
+            masque booléen joueurs x cibles des cibles accessibles
+        '''
+        return self.matrix <= dist_min
+
+    def get_accessibles(self, dist_min):
+        '''
+        :return (dict)
+            liste des cibles accessibles par joueur
+        '''
+        if dist_min not in self._accessibles:
+            mask = self.get_mask(dist_min)
+            self._accessibles[dist_min] = {
+                j: np.flatnonzero(mask[k]).tolist()
+                for j, k in self.rows.items()
+            }
+        return self._accessibles[dist_min]
+
+    def get_accessibles_players(self, dist_min):
+        '''
+        :return (dict)
+            liste des joueurs accessibles par cible
+        '''
+        if dist_min not in self._accessibles_players:
+            mask = self.get_mask(dist_min)
+            players = np.array(self.players_ids)
+            self._accessibles_players[dist_min] = {
+                i: players[mask[:, i]].tolist() for i in range(self.nb_goals)
+            }
+        return self._accessibles_players[dist_min]
+
+    def travel_coast(self, v):
+        '''
+        :param v (dict)
+            indice de la cible de chaque joueur
+        :return
+            coût total des trajets
+        '''
+        if len(v) == 0:
+            return 0
+        rows = [self.rows[j] for j in v.keys()]
+        cols = [int(i) for i in v.values()]
+        return self.matrix[rows, cols].sum().item()
+
+
+def unknown_distances(players_ids, nb_goals):
+    '''
+    :return (DistanceOracle)
+        oracle initial, avant tout calcul de distances : toutes les cibles
+        sont accessibles
+    '''
+    return DistanceOracle(players_ids,
+                          np.full((len(players_ids), nb_goals), -math.inf))
+
+
+def compute_distances(team_positions_dict, goals_positions_list, metric=manhattan):
+    '''
+    :param team_positions_dict (dict)
+        dictionnaire des positions des joueurs de la team
+    :param goals_positions_list (list)
+        liste des positions des cibles
+    :param metric (function)
+        calcul vectorisé de la matrice des distances
+    :return (DistanceOracle)
+    '''
+    players_ids = list(team_positions_dict.keys())
+    players_positions = np.array([team_positions_dict[j] for j in players_ids])
+    goals_positions = np.array(goals_positions_list)
+    return DistanceOracle(players_ids,
+                          metric(players_positions, goals_positions))
@@ -0,0 +1,255 @@
+# -*- coding: utf-8 -*-
+#
+# Intelligence Artificielle & Jeux
+# Sorbonne Université
+#
+# Ben Kabongo
+# Mars 2022
+#
+
+import numpy as np
+import os
+import tempfile
+import time
+
+from payoffs import get_payoff_matrix
+from responses import zero_sum_response
+from settings import CACHE_DIR
+from symmetry import Partitions, partition_wins
+
+
+# probabilité en dessous de laquelle une distribution est retirée du
+# support de l'équilibre
+SUPPORT_MIN_PROBA = 1e-6
+
+
+def zero_sum_matrix(payoffs):
+    '''
+    :param payoffs (PayoffMatrix)
+    :return (np.array)
+        gains à somme nulle : nombre de cibles gagnées moins nombre de
+        cibles perdues
+    '''
+    wins = payoffs.wins.astype(float)
+    return wins - wins.T
+
+
+def solve_zero_sum(A, nb_iter=10000, tol=1e-3):
+    '''
+    résout le jeu à somme nulle de matrice A (le joueur ligne maximise)
+    par regret matching+ à mises à jour alternées et moyennes pondérées
+    :param A (np.array)
+        matrice des gains du joueur ligne
+    :param nb_iter (int)
+        nombre maximum d'itérations
+    :param tol (float)
+        écart de dualité en dessous duquel on s'arrête
+    :return (np.array, np.array, float, float)
+        stratégies mixtes ligne et colonne, valeur du jeu et écart de
+        dualité
+    '''
+    n, m = A.shape
+    regrets_x = np.zeros(n)
+    regrets_y = np.zeros(m)
+    x = np.ones(n) / n
+    y = np.ones(m) / m
+    mean_x = np.zeros(n)
+    mean_y = np.zeros(m)
+    gap = np.inf
+
+    for t in range(1, nb_iter + 1):
+        u = A @ y
+        regrets_x = np.maximum(regrets_x + u - x @ u, 0)
+        s = regrets_x.sum()
+        x = regrets_x / s if s > 0 else np.ones(n) / n
+        mean_x += t * x
+
+        v = x @ A
+        regrets_y = np.maximum(regrets_y + y @ v - v, 0)
+        s = regrets_y.sum()
+        y = regrets_y / s if s > 0 else np.ones(m) / m
+        mean_y += t * y
+
+        if t % 100 == 0 or t == nb_iter:
+            x_ = mean_x / mean_x.sum()
+            y_ = mean_y / mean_y.sum()
+            gap = np.max(A @ y_) - np.min(x_ @ A)
+            if gap < tol:
+                break
+
+    x = mean_x / mean_x.sum()
+    y = mean_y / mean_y.sum()
+    value = x @ A @ y
+    return x, y, value, gap
+
+
+def _cache_path(limit, size, symmetric, cache_dir):
+    suffix = '_sym' if symmetric else ''
+    return os.path.join(cache_dir, f'equilibrium_{limit}_{size}{suffix}.npz')
+
+
+def get_equilibrium(limit, 
+                    size, 
+                    cache_dir=CACHE_DIR, 
+                    nb_iter=10000, 
+                    tol=1e-3,
+                    symmetric=False):
+    '''
+    équilibre de Nash mixte symétrique du jeu de Blotto discret
+
+    Le calcul est fait une seule fois par taille de jeu puis conservé dans
+    un cache sur disque, avec la précision obtenue : il est refait si une
+    précision plus grande est demandée.
+    :param limit (int)
+        nombre de joueurs à répartir
+    :param size (int)
+        nombre de cibles
+    :param cache_dir (str)
+        répertoire du cache, None pour ne pas utiliser de cache
+    :param nb_iter (int)
+        nombre maximum d'itérations (cf. solve_zero_sum)
+    :param tol (float)
+        écart de dualité visé (cf. solve_zero_sum)
+    :param symmetric (bool)
+        si vrai, le jeu est résolu sur les formes canoniques (cf. symmetry),
+        qui doivent être jouées avec une permutation aléatoire des cibles
+    :return (np.array, np.array)
+        les distributions (ou formes canoniques) du support et leurs
+        probabilités
+    '''
+    path = None
+    if cache_dir is not None:
+        path = _cache_path(limit, size, symmetric, cache_dir)
+        if os.path.exists(path):
+            with np.load(path) as data:
+                # le calcul en cache n'est réutilisé que s'il est au moins
+                # aussi précis que celui demandé
+                if 'gap' in data and (
+                        data['gap'] <= tol or
+                        (data['tol'] <= tol and data['nb_iter'] >= nb_iter)):
+                    return data['distribs'], data['probas']
+
+    if symmetric:
+        distribs = np.array(list(Partitions(limit, size)), dtype=np.int64)
+        wins = partition_wins(distribs)
+        A = wins - wins.T
+    else:
+        payoffs = get_payoff_matrix(limit, size)
+        distribs = payoffs.distribs
+        A = zero_sum_matrix(payoffs)
+    x, _, _, gap = solve_zero_sum(A, nb_iter, tol)
+    support = np.flatnonzero(x > SUPPORT_MIN_PROBA)
+    distribs = distribs[support]
+    probas = x[support] / x[support].sum()
+
+    if path is not None:
+        # écriture dans un fichier temporaire puis renommage : un calcul
+        # interrompu ou concurrent ne laisse jamais de fichier incomplet
+        os.makedirs(cache_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(suffix='.npz', dir=cache_dir)
+        try:
+            with os.fdopen(fd, 'wb') as tmp_file:
+                np.savez(tmp_file, distribs=distribs, probas=probas,
+                         gap=gap, tol=tol, nb_iter=nb_iter)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+    return distribs, probas
+
+
+def _zero_sum_block(R, C):
+    '''
+    :return (np.array)
+        gains à somme nulle des distributions de R contre celles de C
+    '''
+    R = np.asarray(R)[:, None, :]
+    C = np.asarray(C)[None, :, :]
+    return (np.sum(R > C, axis=2) - np.sum(R < C, axis=2)).astype(float)
+
+
+def double_oracle(limit, 
+                size, 
+                tol=0.05, 
+                max_iter=200, 
+                time_budget=60., 
+                nb_iter=2000):
+    '''
+    équilibre mixte par double oracle, sans énumérer l'espace des
+    distributions
+
+    Les deux partis disposent d'ensembles restreints de distributions. A
+    chaque itération, le jeu restreint est résolu, puis chaque parti ajoute
+    sa meilleure réponse (programmation dynamique, cf. responses) au
+    mélange de l'autre, jusqu'à ce que l'écart de dualité passe sous tol.
+    :param limit (int)
+        nombre de joueurs à répartir
+    :param size (int)
+        nombre de cibles
+    :param tol (float)
+        écart de dualité visé
+    :param max_iter (int)
+        nombre maximum d'itérations
+    :param time_budget (float)
+        temps de calcul maximum, en secondes
+    :param nb_iter (int)
+        nombre d'itérations de la résolution de chaque jeu restreint
+    :return (np.array, np.array, dict)
+        les distributions du support, leurs probabilités et les
+        statistiques de convergence
+    '''
+    start_time = time.time()
+
+    # distribution initiale : répartition la plus équilibrée possible
+    r0 = tuple(limit // size + (1 if i < limit % size else 0) 
+               for i in range(size))
+    R, C = [r0], [r0]
+    stats = {
+        'iterations': 0,
+        'gap': np.inf,
+        'gaps': [],
+        'value': 0.,
+        'support_sizes': [],
+        'converged': False,
+        'time': 0.
+    }
+
+    while True:
+        A = _zero_sum_block(R, C)
+        x, y, value, _ = solve_zero_sum(A, nb_iter, tol / 10)
+
+        # borne supérieure : meilleure réponse ligne au mélange colonne ;
+        # borne inférieure : meilleure réponse colonne au mélange ligne
+        # (le jeu est antisymétrique)
+        br_row, upper = zero_sum_response(C, y, limit)
+        br_col, lower = zero_sum_response(R, x, limit)
+        gap = upper + lower
+
+        stats['iterations'] += 1
+        stats['gap'] = gap
+        stats['gaps'].append(gap)
+        stats['value'] = value
+        stats['support_sizes'].append((len(R), len(C)))
+        stats['time'] = time.time() - start_time
+
+        if gap < tol:
+            stats['converged'] = True
+            break
+        if (stats['iterations'] >= max_iter or 
+            stats['time'] >= time_budget):
+            break
+
+        added = False
+        if br_row not in R:
+            R.append(br_row)
+            added = True
+        if br_col not in C:
+            C.append(br_col)
+            added = True
+        if not added:
+            break
+
+    support = np.flatnonzero(x > SUPPORT_MIN_PROBA)
+    distribs = np.array(R, dtype=np.int64)[support]
+    probas = x[support] / x[support].sum()
+    return distribs, probas, stats
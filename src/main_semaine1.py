@@ -104,10 +104,7 @@ def main():
         for w in wall_positions:
             g[w] = False
         p = ProblemeGrid2D(players_init_positions[i], goals[i], g, 'manhattan')
-        __stdout = sys.__stdout__
-        sys.stdout = None
-        path = probleme.astar(p)
-        sys.stdout = __stdout
+        path = probleme.astar(p, quiet=True)
         paths.append(path)
         print(f"Chemin trouvé pour le joueur {i} : {path}")
                 
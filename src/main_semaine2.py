@@ -128,10 +128,7 @@ def play(nb_iter,
             for w in wall_positions:
                 g[w] = False
             p = ProblemeGrid2D(players_init_positions[i], goals[i], g, 'manhattan')
-            _stdout = sys.__stdout__
-            sys.stdout = None
-            path = probleme.astar(p)
-            sys.stdout = _stdout
+            path = probleme.astar(p, quiet=True)
             paths[i] = path
             verbose(f"Chemin trouvé pour le joueur {i} : {path}")
                     
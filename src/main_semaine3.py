@@ -13,7 +13,6 @@ from __future__ import (absolute_import,
 import numpy as np
 import random
 import matplotlib.pyplot as plt
-import sys
 import pygame
 import pySpriteWorld.glo
 from pySpriteWorld.gameclass import Game,check_init_game_done
@@ -21,8 +20,10 @@ from pySpriteWorld.spritebuilder import SpriteBuilder
 from pySpriteWorld.players import Player
 from pySpriteWorld.sprite import MovingSprite
 from pySpriteWorld.ontology import Ontology
-from search.grid2D import ProblemeGrid2D
-from search import probleme
+from search.batch import BatchPlanner
+from search.cache import default_cache as path_cache
+from search.shortest_paths import load_shortest_paths, map_fingerprint
+from search.terrain import load_cost_grid
 
 import strategies
 
@@ -56,7 +57,8 @@ def play(
         strat1=strategies.RandomStrategy,
         strat2=strategies.RandomStrategy,
         strat1_args={},
-        strat2_args={}
+        strat2_args={},
+        connectivity=4
         ):
     
     verbose("Initialisation ")
@@ -106,6 +108,19 @@ def play(
             if (row, col) not in wall_positions:
                 legals_positions.append((row, col))
 
+    # table des plus courts chemins entre les cases libres de la carte
+    grid = np.ones((nb_lines, nb_cols), dtype=bool)
+    for w in wall_positions:
+        grid[w] = False
+    # coûts de terrain (None si la carte n'en définit pas : coûts unitaires)
+    terrain_costs = load_cost_grid(game.spriteBuilder.carte)
+    # déplacements : 4 (orthogonaux) ou 8 (diagonales comprises)
+    path_planner = BatchPlanner(grid, terrain_costs, connectivity, 
+                                cache=path_cache)
+    shortest_paths = load_shortest_paths(
+        grid, map_fingerprint(game.spriteBuilder.carte), costs=terrain_costs,
+        connectivity=connectivity)
+
     # initialisation des strategies
     strat1_ = strat1(1, team1_ids, nb_goals, dist_min, **strat1_args)
     strat2_ = strat2(2, team2_ids, nb_goals, dist_min, **strat2_args)
@@ -127,8 +142,12 @@ def play(
         for i in team2_ids:
             team2_positions[i] = players_current_positions[i]
         
-        strat1_.update_distances(team1_positions, goals_current_positions)
-        strat2_.update_distances(team2_positions, goals_current_positions)
+        strat1_.update_distances(team1_positions, 
+                                goals_current_positions, 
+                                shortest_paths.distances)
+        strat2_.update_distances(team2_positions, 
+                                goals_current_positions, 
+                                shortest_paths.distances)
 
         # génération des  des objectifs en fonction des stratégies
         goals_id_team1, distribution_team1 = strat1_.generate()
@@ -151,18 +170,14 @@ def play(
         strat1_.save_day_results(votes)
         strat2_.save_day_results(votes)
 
-        # Calcul de A* pour chaque joueur
-        paths = {}
-        for i in goals.keys():
-            g = np.ones((nb_lines,nb_cols),dtype=bool)
-            for w in wall_positions:
-                g[w] = False
-            p = ProblemeGrid2D(players_init_positions[i], goals[i], g, 'manhattan')
-            _stdout = sys.__stdout__
-            sys.stdout = None
-            path = probleme.astar(p)
-            sys.stdout = _stdout
-            paths[i] = path
+        # chemins des joueurs : un champ de distances par cible, tous
+        # les chemins regroupés dans cells
+        players_ids = list(goals.keys())
+        lengths, offsets, cells = path_planner.paths(
+            [players_init_positions[i] for i in players_ids],
+            [goals[i] for i in players_ids])
+        for k, i in enumerate(players_ids):
+            path = cells[offsets[k]:offsets[k+1]].tolist()
             verbose(f"Chemin trouvé pour le joueur {i} : {path}")
                     
         # changement des positions des cibles
@@ -173,10 +188,10 @@ def play(
             goal_flag_by_player = {i:False for i in goals.keys()}
 
             for it in range(nb_iter):
-                for i in goals.keys():
+                for k, i in enumerate(players_ids):
                     if not goal_flag_by_player[i]:
-                        path = paths[i]
-                        row, col = path[it]
+                        step = min(it, lengths[k] - 1)
+                        row, col = cells[offsets[k] + step].tolist()
                         players_current_positions[i] = (row, col)
                         players[i].set_rowcol(row, col)
                         verbose(f"Pos {i} :({row}, {col})")
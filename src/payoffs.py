@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+#
+# Intelligence Artificielle & Jeux
+# Sorbonne Université
+#
+# Ben Kabongo
+# Mars 2022
+#
+
+import functools
+import numpy as np
+
+from compositions import Compositions
+
+
+class PayoffMatrix:
+    '''
+    Matrice des gains du jeu de Blotto
+
+    Les distributions sont énumérées une seule fois dans un tableau 2D
+    d'entiers ; les nombres de cibles gagnées et les vainqueurs de chaque
+    confrontation sont précalculés par comparaisons vectorisées. Les
+    stratégies accèdent ensuite aux gains par indice.
+    '''
+
+    def __init__(self, distribs):
+        '''
+        :param distribs (list)
+            liste des distributions (toutes de même taille)
+        '''
+        self.distribs = np.array(distribs, dtype=np.int64)
+        if self.distribs.ndim != 2:
+            self.distribs = self.distribs.reshape(len(distribs), -1)
+        self.nb_distribs, self.size = self.distribs.shape
+        self.index = {
+            tuple(r): i for i, r in enumerate(self.distribs.tolist())
+        }
+
+        # wins[a, b] : nombre de cibles où la distribution a bat b
+        dtype = np.int8 if self.size < 128 else np.int32
+        self.wins = np.zeros((self.nb_distribs, self.nb_distribs), dtype=dtype)
+        for i in range(self.size):
+            col = self.distribs[:, i]
+            self.wins += col[:, None] > col[None, :]
+
+        # winners[a, b] : 1 si a bat b, 2 si b bat a, 0 en cas d'égalité
+        # (même règle que strategies.compare)
+        self.winners = self._winners(self.wins)
+
+    def __len__(self):
+        return self.nb_distribs
+
+    def _winners(self, wins):
+        '''
+        applique la règle de strategies.compare à un tableau de scores
+        '''
+        doubled = 2 * wins.astype(np.int32)
+        winners = np.zeros(wins.shape, dtype=np.int8)
+        winners[doubled > self.size] = 1
+        winners[doubled < self.size] = 2
+        return winners
+
+    def distrib(self, i):
+        '''
+        :param i (int)
+            indice d'une distribution
+        :return (tuple)
+            la distribution d'indice i
+        '''
+        return tuple(self.distribs[i].tolist())
+
+    def index_of(self, r):
+        '''
+        :param r (list)
+            distribution
+        :return (int)
+            indice de r dans la matrice, None si r n'y figure pas
+        '''
+        return self.index.get(tuple(r))
+
+    def wins_against(self, r):
+        '''
+        :param r (list)
+            distribution adverse
+        :return (np.array)
+            nombre de cibles gagnées par chaque distribution contre r
+        '''
+        i = self.index_of(r)
+        if i is not None:
+            return self.wins[:, i]
+        # distribution hors de l'espace (équipe adverse de taille différente)
+        return np.sum(self.distribs > np.array(r), axis=1)
+
+    def winners_against(self, r):
+        '''
+        :param r (list)
+            distribution adverse
+        :return (np.array)
+            vainqueur de chaque distribution contre r (cf. compare)
+        '''
+        i = self.index_of(r)
+        if i is not None:
+            return self.winners[:, i]
+        return self._winners(self.wins_against(r))
+
+
+@functools.lru_cache(maxsize=None)
+def get_payoff_matrix(limit, size):
+    '''
+    matrice des gains partagée par toutes les stratégies
+    :param limit (int)
+        nombre maximum de ressources (joueurs) à répartir
+    :param size (int)
+        taille des distributions (nombre de cibles)
+    :return (PayoffMatrix)
+    '''
+    return PayoffMatrix(list(Compositions(limit, size)))
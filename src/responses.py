@@ -0,0 +1,236 @@
+# -*- coding: utf-8 -*-
+#
+# Intelligence Artificielle & Jeux
+# Sorbonne Université
+#
+# Ben Kabongo
+# Mars 2022
+#
+
+import numpy as np
+
+
+# tolérance sur les égalités de scores (sommes de probabilités)
+EPSILON = 1e-9
+
+
+def marginal_cdfs(distribs, weights, limit):
+    '''
+    fonctions de répartition marginales, cible par cible, d'un mélange de
+    distributions adverses
+    :param distribs (list)
+        distributions adverses observées
+    :param weights (list)
+        poids (compteurs ou probabilités) des distributions
+    :param limit (int)
+        nombre maximum de joueurs à répartir
+    :return (np.array)
+        tableau F de taille (nb_goals, limit+1) où F[i, x] est la
+        probabilité que l'adversaire place strictement moins de x joueurs
+        sur la cible i
+    '''
+    distribs = np.asarray(distribs, dtype=np.int64)
+    weights = np.asarray(weights, dtype=float)
+    weights = weights / weights.sum()
+    nb_goals = distribs.shape[1]
+
+    # histogramme des effectifs adverses par cible ; les effectifs qui
+    # dépassent limit ne sont jamais battus et sont regroupés
+    values = np.minimum(distribs, limit + 1)
+    hist = np.zeros((nb_goals, limit + 2))
+    for i in range(nb_goals):
+        np.add.at(hist[i], values[:, i], weights)
+
+    cdfs = np.zeros((nb_goals, limit + 1))
+    cdfs[:, 1:] = np.cumsum(hist, axis=1)[:, :limit]
+    return cdfs
+
+
+def knapsack(values, limit):
+    '''
+    maximise la somme des valeurs par cible sous la contrainte que le
+    nombre total de joueurs alloués soit au plus limit
+    :param values (np.array)
+        tableau de taille (nb_goals, limit+1) : values[i, x] est le gain
+        obtenu en plaçant x joueurs sur la cible i
+    :param limit (int)
+        nombre maximum de joueurs à répartir
+    :return (tuple, float)
+        la distribution optimale (la première dans l'ordre lexicographique
+        en cas d'égalité) et sa valeur
+    '''
+    nb_goals = len(values)
+
+    # best[i, b] : meilleur gain sur les cibles i.. avec b joueurs
+    best = np.zeros((nb_goals + 1, limit + 1))
+    for i in range(nb_goals - 1, -1, -1):
+        for b in range(limit + 1):
+            best[i, b] = np.max(values[i, :b+1] + best[i+1, b::-1])
+
+    r = []
+    b = limit
+    for i in range(nb_goals):
+        scores = values[i, :b+1] + best[i+1, b::-1]
+        x = int(np.argmax(scores >= best[i, b] - EPSILON))
+        r.append(x)
+        b -= x
+    return tuple(r), best[0, limit]
+
+
+def best_response(distribs, weights, limit):
+    '''
+    meilleure réponse à un mélange de distributions adverses
+
+    Le score espéré d'une distribution r est la somme sur les cibles de la
+    probabilité que l'adversaire place moins de r_i joueurs sur la cible i :
+    l'objectif est séparable et se résout par programmation dynamique en
+    O(nb_goals x limit²), sans énumérer l'espace des distributions.
+    :param distribs (list)
+        distributions adverses observées
+    :param weights (list)
+        poids (compteurs ou probabilités) des distributions
+    :param limit (int)
+        nombre maximum de joueurs à répartir
+    :return (tuple, float)
+        la meilleure réponse et son score espéré
+    '''
+    return knapsack(marginal_cdfs(distribs, weights, limit), limit)
+
+
+class _CheapestCosts:
+    '''
+    Ensemble de coûts supportant la suppression et la somme des w plus
+    petits coûts restants en O(log k) (arbres de Fenwick indexés par le
+    rang des coûts)
+    '''
+
+    def __init__(self, costs):
+        self.n = len(costs)
+        order = sorted(range(self.n), key=lambda i: costs[i])
+        self.rank = [0] * self.n
+        for rank, i in enumerate(order):
+            self.rank[i] = rank + 1
+        self.counts = [0] * (self.n + 1)
+        self.sums = [0] * (self.n + 1)
+        for i, c in enumerate(costs):
+            self._add(self.rank[i], 1, c)
+        self.costs = costs
+        self.size = self.n
+
+    def _add(self, j, count, cost):
+        while j <= self.n:
+            self.counts[j] += count
+            self.sums[j] += cost
+            j += j & -j
+
+    def remove(self, i):
+        self._add(self.rank[i], -1, -self.costs[i])
+        self.size -= 1
+
+    def smallest_sum(self, w):
+        '''
+        :return (int)
+            somme des w plus petits coûts restants
+        '''
+        j = 0
+        total = 0
+        step = 1 << self.n.bit_length()
+        while step > 0:
+            if j + step <= self.n and self.counts[j + step] <= w:
+                j += step
+                w -= self.counts[j]
+                total += self.sums[j]
+            step >>= 1
+        return total
+
+
+def _max_wins(costs, limit):
+    '''
+    :return (int)
+        nombre maximum de cibles gagnables avec limit joueurs
+    '''
+    wins = 0
+    for c in sorted(costs):
+        if c > limit:
+            break
+        limit -= c
+        wins += 1
+    return wins
+
+
+def _first_answer(costs, limit, nb_wins):
+    '''
+    première distribution, dans l'ordre lexicographique, qui gagne
+    exactement nb_wins cibles : une cible est laissée vide tant que les
+    cibles suivantes permettent encore d'atteindre nb_wins victoires
+    '''
+    remaining = _CheapestCosts(costs)
+    answer = []
+    for i, c in enumerate(costs):
+        remaining.remove(i)
+        if nb_wins == 0 or (remaining.size >= nb_wins and 
+                            remaining.smallest_sum(nb_wins) <= limit):
+            answer.append(0)
+        else:
+            answer.append(c)
+            limit -= c
+            nb_wins -= 1
+    return tuple(answer)
+
+
+def greedy_better_answer(r, limit):
+    '''
+    réponse exacte de strategies.better_answer en O(k log k) : la première
+    distribution, dans l'ordre lexicographique, qui bat r sur plus de la
+    moitié des cibles
+    :param r (list)
+        stratégie de répartition adverse
+    :param limit (int)
+        nombre maximum de joueurs à répartir
+    :return (tuple)
+        la réponse, None s'il n'en existe pas
+    '''
+    costs = [int(x) + 1 for x in r]
+    nb_wins = len(r) // 2 + 1
+    if _max_wins(costs, limit) < nb_wins:
+        return None
+    return _first_answer(costs, limit, nb_wins)
+
+
+def greedy_best_answer(r, limit):
+    '''
+    réponse exacte de strategies.best_answer en O(k log k) : on gagne les
+    cibles les moins chères en y plaçant r_i + 1 joueurs, puis on retient
+    la première distribution, dans l'ordre lexicographique, qui gagne ce
+    nombre maximal de cibles
+    :param r (list)
+        stratégie de répartition adverse
+    :param limit (int)
+        nombre maximum de joueurs à répartir
+    :return (tuple)
+        la réponse, None si aucune distribution ne bat r
+    '''
+    costs = [int(x) + 1 for x in r]
+    nb_wins = _max_wins(costs, limit)
+    if nb_wins < len(r) // 2 + 1:
+        return None
+    return _first_answer(costs, limit, nb_wins)
+
+
+def zero_sum_response(distribs, weights, limit):
+    '''
+    meilleure réponse à un mélange de distributions adverses lorsque le
+    gain est le nombre de cibles gagnées moins le nombre de cibles perdues
+    :param distribs (list)
+        distributions adverses
+    :param weights (list)
+        poids (compteurs ou probabilités) des distributions
+    :param limit (int)
+        nombre maximum de joueurs à répartir
+    :return (tuple, float)
+        la meilleure réponse et son gain espéré
+    '''
+    # F[i, x] = P(adv_i < x) pour x dans [0, limit+1]
+    cdfs = marginal_cdfs(distribs, weights, limit + 1)
+    values = cdfs[:, :limit+1] - (1 - cdfs[:, 1:])
+    return knapsack(values, limit)
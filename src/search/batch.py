@@ -0,0 +1,184 @@
+# -*- coding: utf-8 -*-
+"""
+Calcul groupé des chemins de tous les joueurs
+
+Les départs et les buts sont donnés sous forme d'arrays (n, 2). Un seul
+champ de distances est calculé par but distinct, puis tous les joueurs
+visant ce but descendent le champ ensemble, pas à pas (un pas de tous les
+joueurs est une opération vectorisée). Les chemins sont rendus regroupés :
+longueurs, décalages et un unique array des cases, sans créer d'objet
+Python par case ni par joueur. Les tampons de travail sont conservés d'un
+appel à l'autre. Avec un cache de chemins (cf. search.cache.PathCache), les
+couples (départ, but) déjà rencontrés ne sont pas recalculés.
+"""
+
+import numpy as np
+
+from search.fields import (MOVE_COSTS, dial_field, grid_fingerprint, 
+                           neighbour_table, octile_field, step_costs)
+
+
+class BatchPlanner:
+    """ chemins groupés sur une grille (array booléen, False: obstacle),
+        éventuellement pondérée par une grille de coûts d'entrée dans
+        chaque case, en 4- ou 8-connexité (cf. search.fields pour
+        move_costs et corner_cutting) ; à égalité de coût, un chemin passe
+        par le premier voisin dans l'ordre des déplacements
+        cache : cache de chemins (PathCache), les chemins y sont rangés
+        sous forme d'arrays d'indices à plat
+        """
+
+    def __init__(self,grid,costs=None,
+                 connectivity=4,move_costs=MOVE_COSTS,corner_cutting=False,
+                 cache=None):
+        self.grid = grid
+        self.costs = costs
+        self.connectivity = connectivity
+        self.move_costs = move_costs
+        self.corner_cutting = corner_cutting
+        (self.nb_rows,self.nb_cols) = grid.shape
+        self.neighbours = neighbour_table(grid, connectivity, corner_cutting)
+        self.free = grid.ravel()
+        # coût du déplacement vers chaque voisin
+        if connectivity == 4:
+            self.step_costs = step_costs(grid, self.neighbours, (1,1), costs)
+        else:
+            self.step_costs = step_costs(grid, self.neighbours, move_costs,
+                                         costs)
+        # tampons réutilisés
+        self._field = np.empty(grid.size, dtype=self.step_costs.dtype)
+        self._flat = np.empty(0, dtype=np.int64)
+        self._cells = np.empty((0,2), dtype=np.int64)
+        self.nb_fields = 0
+        self.cache = cache
+        # version de la grille et du modèle de déplacement dans le cache
+        self.version = None
+        if cache is not None:
+            self.version = ('batch', grid_fingerprint(grid, costs),
+                            connectivity, tuple(move_costs), corner_cutting)
+
+    def _reverse_field(self,goal):
+        """ coût de chaque case jusqu'à la case goal (indice à plat), dans
+            le tampon du champ ; -1 pour les cases inaccessibles
+            """
+        field = self._field
+        field.fill(-1)
+        self.nb_fields += 1
+        if not self.free[goal]:
+            return field
+        if self.connectivity == 8:
+            source = divmod(int(goal), self.nb_cols)
+            field[:] = octile_field(self.grid, source, self.move_costs,
+                                    self.costs, self.corner_cutting,
+                                    reverse=True).ravel()
+            return field
+        if self.costs is not None:
+            source = divmod(int(goal), self.nb_cols)
+            field[:] = dial_field(self.grid, self.costs, source,
+                                  reverse=True).ravel()
+            return field
+        frontier = np.array([goal])
+        field[frontier] = 0
+        d = 0
+        while frontier.size > 0:
+            d += 1
+            succ = self.neighbours[frontier].ravel()
+            succ = succ[succ >= 0]
+            succ = np.unique(succ[field[succ] < 0])
+            field[succ] = d
+            frontier = succ
+        return field
+
+    def _descend(self,field,starts):
+        """ descente simultanée du champ depuis les cases starts
+            retourne la liste des pas : array (nb de pas, len(starts)) des
+            cases occupées, -1 pour les chemins déjà terminés
+            """
+        cur = starts.copy()
+        steps = [cur]
+        rows = np.arange(len(cur))
+        active = field[cur] > 0
+        while active.any():
+            nb = self.neighbours[cur[active]]
+            fn = field[np.maximum(nb, 0)]
+            # premier voisin (dans l'ordre des déplacements) qui descend le
+            # champ : coût du pas + champ minimal (égal au champ de la case,
+            # aux erreurs d'arrondi près en 8-connexité)
+            total = np.where((nb >= 0) & (fn >= 0),
+                             fn + self.step_costs[cur[active]], np.inf)
+            nxt = nb[rows[:len(nb)], total.argmin(axis=1)]
+            cur = np.full(len(cur), -1, dtype=np.int64)
+            cur[active] = nxt
+            steps.append(cur)
+            active = cur >= 0
+            active[active] = field[cur[active]] > 0
+        return np.array(steps)
+
+    def paths(self,starts,goals):
+        """ calcule les chemins starts[k] -> goals[k]
+            starts, goals : positions (ligne, colonne), arrays (n, 2)
+            retourne (lengths, offsets, cells) :
+            - lengths : nombre de cases de chaque chemin (départ et but
+              inclus), 1 si le but est inaccessible (le chemin est réduit
+              au départ)
+            - offsets : array (n+1), le chemin k est
+              cells[offsets[k]:offsets[k+1]]
+            - cells : array (somme des longueurs, 2) des positions
+            cells est un tampon réutilisé : il reste valide jusqu'au
+            prochain appel
+            """
+        starts = np.asarray(starts, dtype=np.int64).reshape(-1,2)
+        goals = np.asarray(goals, dtype=np.int64).reshape(-1,2)
+        n = len(starts)
+        flat_starts = starts[:,0] * self.nb_cols + starts[:,1]
+        flat_goals = goals[:,0] * self.nb_cols + goals[:,1]
+        lengths = np.ones(n, dtype=np.int64)
+
+        # chemins déjà en cache
+        cached = {}
+        hit = np.zeros(n, dtype=bool)
+        if self.cache is not None:
+            for k,(start,goal) in enumerate(zip(starts.tolist(),
+                                                 goals.tolist())):
+                path = self.cache.get(start, goal, self.version)
+                if path is not None:
+                    cached[k] = path
+                    lengths[k] = len(path)
+                    hit[k] = True
+        todo = np.flatnonzero(~hit)
+
+        unique_goals, groups = np.unique(flat_goals[todo], return_inverse=True)
+        traces = [None] * len(unique_goals)
+        for g,goal in enumerate(unique_goals):
+            members = todo[groups == g]
+            field = self._reverse_field(goal)
+            trace = self._descend(field, flat_starts[members])
+            traces[g] = (members, trace)
+            lengths[members] = (trace >= 0).sum(axis=0)
+
+        offsets = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        total = int(offsets[-1])
+        if len(self._flat) < total:
+            capacity = max(total, 2 * len(self._flat))
+            self._flat = np.empty(capacity, dtype=np.int64)
+            self._cells = np.empty((capacity,2), dtype=np.int64)
+        flat = self._flat[:total]
+        for (members,trace) in traces:
+            # ordre colonne par colonne : les cases de chaque chemin sont
+            # consécutives, dans l'ordre des joueurs du groupe
+            cells = trace.T[trace.T >= 0]
+            sizes = lengths[members]
+            first = np.repeat(np.cumsum(sizes) - sizes, sizes)
+            flat[np.repeat(offsets[members], sizes) +
+                 np.arange(len(cells)) - first] = cells
+        for k,path in cached.items():
+            flat[offsets[k]:offsets[k+1]] = path
+        if self.cache is not None:
+            for k in todo.tolist():
+                path = flat[offsets[k]:offsets[k+1]].copy()
+                self.cache.put(starts[k].tolist(), goals[k].tolist(),
+                               self.version, path)
+        cells = self._cells[:total]
+        np.divmod(flat, self.nb_cols, out=(cells[:,0],cells[:,1]))
+        return lengths, offsets, cells
@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+"""
+Cache LRU des chemins calculés sur une grille
+
+Les chemins sont indexés par (départ, but, version de la grille), où la
+version est une empreinte de la grille et de ses coûts éventuels (cf.
+search.fields.grid_fingerprint) : modifier la grille change l'empreinte, les anciens chemins ne sont alors
+plus jamais servis et finissent par être évincés. Un même cache peut être
+partagé par toutes les stratégies et toutes les confrontations d'un
+tournoi.
+"""
+
+from collections import OrderedDict
+
+from search.fields import grid_fingerprint
+
+
+# taille par défaut du cache
+MAXSIZE = 4096
+
+
+class PathCache:
+    """ cache LRU borné de chemins, avec compteurs de succès et d'échecs
+        """
+
+    def __init__(self,maxsize=MAXSIZE):
+        self.maxsize = maxsize
+        self.paths = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.paths)
+
+    def get(self,start,goal,version):
+        """ retourne le chemin de start à goal sur la grille de version
+            donnée, None s'il n'est pas en cache
+            le chemin retourné est partagé : il ne doit pas être modifié
+            """
+        key = (tuple(start),tuple(goal),version)
+        path = self.paths.get(key)
+        if path is None:
+            self.misses += 1
+            return None
+        self.paths.move_to_end(key)
+        self.hits += 1
+        return path
+
+    def put(self,start,goal,version,path):
+        """ ajoute un chemin au cache, en évinçant le moins récemment
+            utilisé si le cache est plein
+            """
+        key = (tuple(start),tuple(goal),version)
+        self.paths[key] = path
+        self.paths.move_to_end(key)
+        if len(self.paths) > self.maxsize:
+            self.paths.popitem(last=False)
+
+    def astar(self,p,version=None):
+        """ application de l'algorithme a-star (sans affichage) sur un
+            ProblemeGrid2D, en passant par le cache
+            version : empreinte de p.grid et de ses coûts si elle est déjà
+            connue
+            """
+        from search import probleme
+        if version is None:
+            version = grid_fingerprint(p.grid, getattr(p,'costs',None))
+        version = (version,p.heuristique,getattr(p,'connectivity',4),
+                   getattr(p,'move_costs',None),getattr(p,'corner_cutting',False))
+        path = self.get(p.init,p.but,version)
+        if path is None:
+            path = probleme.astar(p,quiet=True)
+            self.put(p.init,p.but,version,path)
+        return path
+
+    def info(self):
+        """ retourne les statistiques du cache dans un dictionnaire
+            """
+        total = self.hits + self.misses
+        return {'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / total if total > 0 else 0.,
+                'size': len(self.paths),
+                'maxsize': self.maxsize}
+
+    def clear(self):
+        """ vide le cache et remet les compteurs à zéro
+            """
+        self.paths.clear()
+        self.hits = 0
+        self.misses = 0
+
+
+# cache partagé par défaut
+default_cache = PathCache()
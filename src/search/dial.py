@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+"""
+Plus court chemin sur grille pondérée par l'algorithme de Dial
+
+Les coûts sont de petits entiers : la file de priorité est un tableau
+circulaire de max(coûts)+1 seaux au lieu d'un tas binaire. Une requête coûte
+O(cases + coût du chemin).
+"""
+
+import time
+import numpy as np
+
+from search.fields import neighbour_lists
+from search.grid2D import ProblemeGrid2D
+from search.probleme import SearchResult
+
+
+def supports(p):
+    """ retourne vrai si le probleme p peut être résolu par ce moteur :
+        ProblemeGrid2D pondéré, en 4-connexité, dont les coûts,
+        successeurs et but n'ont pas été redéfinis
+        """
+    t = type(p)
+    return (isinstance(p, ProblemeGrid2D) and
+            t.cost is ProblemeGrid2D.cost and
+            t.successeurs is ProblemeGrid2D.successeurs and
+            t.estBut is ProblemeGrid2D.estBut and
+            getattr(p, 'costs', None) is not None and
+            getattr(p, 'connectivity', 4) == 4)
+
+
+def dial(p):
+    """ application de l'algorithme de Dial sur un ProblemeGrid2D muni
+        d'une grille de coûts (p.costs, coût d'entrée dans chaque case)
+        retourne le chemin de l'état initial au but (SearchResult), réduit
+        à l'état initial si le but est inaccessible
+        """
+    startTime = time.time()
+    grid = p.grid
+    (nb_rows,nb_cols) = grid.shape
+    neighbours = neighbour_lists(grid)
+    if p.costs is None:
+        cost = [1] * grid.size
+    else:
+        cost = np.asarray(p.costs, dtype=np.int64).ravel().tolist()
+    (x,y) = (int(p.init[0]),int(p.init[1]))
+    (gx,gy) = (int(p.but[0]),int(p.but[1]))
+    start = x * nb_cols + y
+    goal = gx * nb_cols + gy
+    if not (0 <= gx < nb_rows and 0 <= gy < nb_cols):
+        goal = -1
+
+    nb_buckets = max(cost) + 1
+    buckets = [[] for _ in range(nb_buckets)]
+    inf = float('inf')
+    dist = [inf] * grid.size
+    parent = [-1] * grid.size
+    dist[start] = 0
+    buckets[0].append(start)
+    pending = 1
+    nodes_expanded = 0
+    frontier_peak = 1
+    reopenings = 0
+    found = start == goal
+    d = 0
+    while pending > 0 and not found:
+        bucket = buckets[d % nb_buckets]
+        while bucket:
+            c = bucket.pop()
+            pending -= 1
+            if dist[c] != d:
+                reopenings += 1
+                continue
+            if c == goal:
+                found = True
+                break
+            nodes_expanded += 1
+            for n in neighbours[c]:
+                nd = d + cost[n]
+                if nd < dist[n]:
+                    dist[n] = nd
+                    parent[n] = c
+                    buckets[nd % nb_buckets].append(n)
+                    pending += 1
+            if pending > frontier_peak:
+                frontier_peak = pending
+        d += 1
+
+    path = [p.init]
+    if found and goal != start:
+        cells = [goal]
+        while parent[cells[-1]] != start:
+            cells.append(parent[cells[-1]])
+        path += [divmod(c, nb_cols) for c in reversed(cells)]
+    return SearchResult(path,
+                        nodes_expanded=nodes_expanded,
+                        frontier_peak=frontier_peak,
+                        reopenings=reopenings,
+                        time=time.time() - startTime)
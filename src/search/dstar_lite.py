@@ -0,0 +1,187 @@
+# -*- coding: utf-8 -*-
+"""
+Replanification incrémentale par D* Lite
+
+La recherche part du but : g(s) estime le coût de s jusqu'au but et rhs(s)
+en est la valeur recalculée à partir des voisins. Lorsqu'une case change
+d'état (libre / obstacle), seules les cases voisines sont mises à jour, et
+la recherche suivante ne répare que la région affectée. L'état de recherche
+étant attaché au but, un même planificateur sert tous les joueurs qui
+visent ce but, quel que soit leur point de départ (le terme km de D* Lite
+rend les clés valides pour tout nouveau départ, l'heuristique de Manhattan
+vérifiant l'inégalité triangulaire).
+"""
+
+import heapq
+
+from search.fields import MOVES
+from search.probleme import SearchResult
+
+
+class DStarLite:
+    """ planificateur D* Lite vers un but fixé, sur une grille 4-connexe
+        (array booléen, False: obstacle) éventuellement pondérée par une
+        grille de coûts d'entrée dans chaque case
+        """
+
+    def __init__(self,grid,but,costs=None):
+        (self.nb_rows,self.nb_cols) = grid.shape
+        self.free = grid.ravel().tolist()
+        self.cost = (None if costs is None
+                     else [int(c) for c in costs.ravel().tolist()])
+        self.but = tuple(but)
+        self.goal = self._index(self.but)
+        size = self.nb_rows * self.nb_cols
+        inf = float('inf')
+        self.g = [inf] * size
+        self.rhs = [inf] * size
+        self.rhs[self.goal] = 0
+        # voisins dans la grille (obstacles compris)
+        self.neighbours = []
+        for c in range(size):
+            (x,y) = divmod(c, self.nb_cols)
+            self.neighbours.append([(x+dx) * self.nb_cols + y+dy
+                                    for (dx,dy) in MOVES
+                                    if 0 <= x+dx < self.nb_rows and
+                                       0 <= y+dy < self.nb_cols])
+        self.km = 0
+        self.start = None
+        # file de priorité à suppression paresseuse : keys contient la clé
+        # courante des cases présentes dans la file
+        self.queue = []
+        self.keys = {}
+        self.nodes_expanded = 0
+        self._push(self.goal)
+
+    def _index(self,etat):
+        (x,y) = etat
+        return int(x) * self.nb_cols + int(y)
+
+    def _h(self,a,b):
+        (ax,ay) = divmod(a, self.nb_cols)
+        (bx,by) = divmod(b, self.nb_cols)
+        return abs(ax-bx) + abs(ay-by)
+
+    def _c(self,u,v):
+        """ coût du déplacement de u vers la case voisine v
+            """
+        if not (self.free[u] and self.free[v]):
+            return float('inf')
+        return 1 if self.cost is None else self.cost[v]
+
+    def _key(self,s):
+        m = min(self.g[s], self.rhs[s])
+        return (m + self._h(self.start, s) + self.km, m)
+
+    def _push(self,s):
+        key = (self._key(s) if self.start is not None
+               else (self.rhs[s], self.rhs[s]))
+        self.keys[s] = key
+        heapq.heappush(self.queue, (key, s))
+
+    def _top(self):
+        """ retire les entrées périmées et retourne la première clé
+            """
+        while self.queue:
+            (key,s) = self.queue[0]
+            if self.keys.get(s) == key:
+                return key
+            heapq.heappop(self.queue)
+        return (float('inf'), float('inf'))
+
+    def _update_vertex(self,u):
+        if u != self.goal:
+            self.rhs[u] = min((self._c(u,v) + self.g[v]
+                               for v in self.neighbours[u]),
+                              default=float('inf'))
+        self.keys.pop(u, None)
+        if self.g[u] != self.rhs[u]:
+            self._push(u)
+
+    def _compute_shortest_path(self):
+        start = self.start
+        while (self._top() < self._key(start) or
+               self.rhs[start] != self.g[start]):
+            k_old = self._top()
+            if k_old == (float('inf'), float('inf')):
+                break
+            (_,u) = heapq.heappop(self.queue)
+            del self.keys[u]
+            k_new = self._key(u)
+            if k_old < k_new:
+                self._push(u)
+            elif self.g[u] > self.rhs[u]:
+                self.nodes_expanded += 1
+                self.g[u] = self.rhs[u]
+                for v in self.neighbours[u]:
+                    self._update_vertex(v)
+            else:
+                self.nodes_expanded += 1
+                self.g[u] = float('inf')
+                for v in self.neighbours[u] + [u]:
+                    self._update_vertex(v)
+
+    def set_blocked(self,etat,blocked=True):
+        """ rend la case etat infranchissable (ou de nouveau libre) ; la
+            réparation est faite au prochain appel de path
+            """
+        u = self._index(etat)
+        if self.free[u] == (not blocked):
+            return
+        self.free[u] = not blocked
+        for v in self.neighbours[u] + [u]:
+            self._update_vertex(v)
+
+    def path(self,init):
+        """ retourne le chemin de init au but (SearchResult), réduit à
+            init si le but est inaccessible
+            """
+        self.nodes_expanded = 0
+        s = self._index(init)
+        if self.start is None:
+            # première recherche : les clés de la file sont recalculées
+            self.start = s
+            for u in list(self.keys):
+                self.keys.pop(u)
+                self._push(u)
+        else:
+            self.km += self._h(self.start, s)
+            self.start = s
+        self._compute_shortest_path()
+
+        path = [init]
+        if self.g[s] == float('inf'):
+            return SearchResult(path, nodes_expanded=self.nodes_expanded)
+        while s != self.goal and len(path) <= len(self.g):
+            # successeur le plus prometteur (ordre des MOVES à égalité)
+            s = min(self.neighbours[s],
+                    key=lambda v: self._c(s,v) + self.g[v])
+            path.append(divmod(s, self.nb_cols))
+        return SearchResult(path, nodes_expanded=self.nodes_expanded)
+
+
+class DStarLitePlanner:
+    """ un planificateur D* Lite par but, partagés par tous les joueurs ;
+        les changements de la grille sont transmis à tous les
+        planificateurs existants
+        """
+
+    def __init__(self,grid,costs=None):
+        self.grid = grid.copy()
+        self.costs = costs
+        self.planners = {}
+
+    def path(self,init,but):
+        """ retourne le chemin de init à but (SearchResult)
+            """
+        but = tuple(but)
+        if but not in self.planners:
+            self.planners[but] = DStarLite(self.grid, but, self.costs)
+        return self.planners[but].path(init)
+
+    def set_blocked(self,etat,blocked=True):
+        """ ferme (ou rouvre) la case etat pour tous les buts
+            """
+        self.grid[tuple(etat)] = not blocked
+        for planner in self.planners.values():
+            planner.set_blocked(etat, blocked)
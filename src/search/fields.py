@@ -0,0 +1,281 @@
+# -*- coding: utf-8 -*-
+"""
+Champs de distances sur une grille 2D
+
+Une grille est un array booléen (False: obstacle), les cases sont indicées
+à plat (ligne * nb_colonnes + colonne). Les voisins d'une case sont pris
+dans le même ordre que ProblemeGrid2D.successeurs. Une grille de coûts
+optionnelle (entiers strictement positifs) donne le coût d'entrée dans
+chaque case ; sans elle, tous les déplacements coûtent 1.
+
+En 8-connexité, les déplacements en diagonale suivent MOVES ; un pas
+orthogonal coûte move_costs[0], un pas diagonal move_costs[1] (multipliés
+par le coût d'entrée dans la case d'arrivée). Une diagonale ne peut pas
+passer entre deux obstacles, ni (sans corner_cutting) longer le coin d'un
+obstacle.
+"""
+
+import functools
+import hashlib
+import heapq
+import math
+import numpy as np
+
+
+# déplacements, dans l'ordre de ProblemeGrid2D.successeurs
+MOVES = [(0,1),(1,0),(0,-1),(-1,0)]
+
+# déplacements en diagonale, après MOVES en 8-connexité
+DIAGONAL_MOVES = [(1,1),(1,-1),(-1,1),(-1,-1)]
+
+# coûts d'un pas orthogonal et d'un pas diagonal
+MOVE_COSTS = (1, math.sqrt(2))
+
+# mêmes coûts à l'échelle entière (7/5 approche racine de 2), pour garder
+# des distances entières
+INTEGER_MOVE_COSTS = (5, 7)
+
+# nombre de grilles dont les données précalculées sont conservées (cf.
+# per_grid_cache)
+MAX_GRIDS = 16
+
+
+def grid_fingerprint(grid, costs=None):
+    """ retourne une empreinte de la grille (dimensions et obstacles) et
+        de ses coûts éventuels
+        """
+    data = np.packbits(np.asarray(grid, dtype=bool))
+    h = hashlib.sha1(str(grid.shape).encode('utf-8'))
+    h.update(data.tobytes())
+    if costs is not None:
+        h.update(np.ascontiguousarray(costs, dtype=np.int64).tobytes())
+    return h.hexdigest()
+
+
+def per_grid_cache(builder):
+    """ décorateur : builder(grid, *args) n'est appelé qu'une fois par
+        grille (et par valeur des autres arguments) ; les résultats sont
+        indexés par l'empreinte de la grille, la plus ancienne est évincée
+        au-delà de MAX_GRIDS grilles
+        """
+    cache = {}
+
+    @functools.wraps(builder)
+    def get(grid, *args):
+        key = (grid_fingerprint(grid),) + args
+        if key not in cache:
+            if len(cache) >= MAX_GRIDS:
+                cache.pop(next(iter(cache)))
+            cache[key] = builder(grid, *args)
+        return cache[key]
+
+    get.cache = cache
+    return get
+
+
+def grid_moves(connectivity=4):
+    """ retourne la liste des déplacements en 4- ou 8-connexité
+        """
+    if connectivity == 4:
+        return MOVES
+    if connectivity == 8:
+        return MOVES + DIAGONAL_MOVES
+    raise ValueError(f"Connexité non supportée : {connectivity}")
+
+
+def diagonal_allowed(grid, etat, move, corner_cutting=False):
+    """ retourne vrai si le déplacement diagonal move depuis etat ne
+        traverse pas un coin : les deux cases orthogonales qu'il longe
+        doivent être libres (au moins l'une d'elles avec corner_cutting)
+        """
+    (x,y) = etat
+    (inc_x,inc_y) = move
+    (a,b) = (grid[x+inc_x,y],grid[x,y+inc_y])
+    return (a or b) if corner_cutting else (a and b)
+
+
+def neighbour_table(grid, connectivity=4, corner_cutting=False):
+    """ retourne un array (nb_cases, nb de déplacements) des indices à
+        plat des voisins libres de chaque case, -1 si le voisin est un
+        obstacle, en dehors de la grille ou derrière un coin
+        """
+    (nb_rows,nb_cols) = grid.shape
+    rows, cols = np.indices(grid.shape)
+    rows = rows.ravel()
+    cols = cols.ravel()
+    moves = grid_moves(connectivity)
+    table = np.full((grid.size,len(moves)), -1, dtype=np.int64)
+    for k,(inc_x,inc_y) in enumerate(moves):
+        x = rows + inc_x
+        y = cols + inc_y
+        valid = (x >= 0) & (x < nb_rows) & (y >= 0) & (y < nb_cols)
+        valid[valid] = grid[x[valid],y[valid]]
+        if inc_x != 0 and inc_y != 0:
+            a = grid[x[valid],cols[valid]]
+            b = grid[rows[valid],y[valid]]
+            valid[valid] = (a | b) if corner_cutting else (a & b)
+        table[valid,k] = x[valid] * nb_cols + y[valid]
+    return table
+
+
+def step_costs(grid, neighbours, move_costs=MOVE_COSTS, costs=None):
+    """ retourne le coût du déplacement vers chaque voisin d'une table de
+        voisins (même forme que neighbours), coût d'entrée dans le voisin
+        compris
+        """
+    nb_moves = neighbours.shape[1]
+    scale = np.array([move_costs[0]] * len(MOVES) +
+                     [move_costs[1]] * (nb_moves - len(MOVES)))
+    if costs is None:
+        return np.broadcast_to(scale, neighbours.shape).copy()
+    flat = np.asarray(costs).ravel()
+    return flat[np.maximum(neighbours, 0)] * scale
+
+
+def distance_field(grid, source, neighbours=None):
+    """ parcours en largeur depuis la case source
+        retourne un array de la taille de la grille contenant le nombre
+        de pas jusqu'à source, -1 pour les cases inaccessibles
+        """
+    if neighbours is None:
+        neighbours = neighbour_table(grid)
+    field = np.full(grid.size, -1, dtype=np.int32)
+    if not grid[source]:
+        return field.reshape(grid.shape)
+    (_,nb_cols) = grid.shape
+    (x,y) = source
+    frontier = np.array([x * nb_cols + y])
+    field[frontier] = 0
+    d = 0
+    # un front d'onde par distance : les cases du front sont traitées
+    # ensemble
+    while frontier.size > 0:
+        d += 1
+        succ = neighbours[frontier].ravel()
+        succ = succ[succ >= 0]
+        succ = np.unique(succ[field[succ] < 0])
+        field[succ] = d
+        frontier = succ
+    return field.reshape(grid.shape)
+
+
+@per_grid_cache
+def neighbour_lists(grid):
+    """ retourne, pour chaque case, la liste des indices à plat de ses
+        voisins libres (plus rapide à parcourir case par case qu'une ligne
+        de neighbour_table) ; calculé une seule fois par grille
+        """
+    return [[n for n in row if n >= 0]
+            for row in neighbour_table(grid).tolist()]
+
+
+def dial_field(grid, costs, source, reverse=False):
+    """ plus courts chemins pondérés depuis la case source (algorithme de
+        Dial : file de priorité circulaire à max(costs)+1 seaux)
+        reverse=False : coût de source vers chaque case
+        reverse=True : coût de chaque case vers source
+        retourne un array de la taille de la grille, -1 pour les cases
+        inaccessibles
+        """
+    neighbours = neighbour_lists(grid)
+    cost = np.asarray(costs, dtype=np.int64).ravel().tolist()
+    field = np.full(grid.size, -1, dtype=np.int64)
+    if not grid[source]:
+        return field.reshape(grid.shape)
+    (_,nb_cols) = grid.shape
+    (x,y) = source
+    s = x * nb_cols + y
+    nb_buckets = max(cost) + 1
+    buckets = [[] for _ in range(nb_buckets)]
+    inf = float('inf')
+    dist = [inf] * grid.size
+    dist[s] = 0
+    buckets[0].append(s)
+    pending = 1
+    d = 0
+    while pending > 0:
+        bucket = buckets[d % nb_buckets]
+        while bucket:
+            c = bucket.pop()
+            pending -= 1
+            if dist[c] != d:
+                continue
+            field[c] = d
+            for n in neighbours[c]:
+                # coût d'entrée dans la case d'arrivée du déplacement
+                nd = d + (cost[c] if reverse else cost[n])
+                if nd < dist[n]:
+                    dist[n] = nd
+                    buckets[nd % nb_buckets].append(n)
+                    pending += 1
+        d += 1
+    return field.reshape(grid.shape)
+
+
+def octile_field(grid, source, move_costs=MOVE_COSTS, costs=None,
+                 corner_cutting=False, reverse=False):
+    """ plus courts chemins en 8-connexité depuis la case source
+        (algorithme de Dijkstra)
+        reverse=False : coût de source vers chaque case
+        reverse=True : coût de chaque case vers source
+        retourne un array de la taille de la grille (entier si les coûts
+        sont entiers), -1 pour les cases inaccessibles
+        """
+    neighbours = neighbour_table(grid, 8, corner_cutting)
+    steps = step_costs(grid, neighbours, move_costs)
+    if costs is not None:
+        flat = np.asarray(costs).ravel()
+        if reverse:
+            # coût d'entrée dans la case de départ du déplacement
+            steps = steps * flat[:,None]
+        else:
+            steps = steps * flat[np.maximum(neighbours, 0)]
+    integer = all(isinstance(c, (int, np.integer)) for c in move_costs)
+    field = np.full(grid.size, -1, dtype=np.int64 if integer else float)
+    if not grid[source]:
+        return field.reshape(grid.shape)
+    if integer:
+        steps = np.rint(steps).astype(np.int64)
+    neighbours = neighbours.tolist()
+    steps = steps.tolist()
+    (_,nb_cols) = grid.shape
+    (x,y) = source
+    s = x * nb_cols + y
+    dist = {s: 0}
+    frontier = [(0, s)]
+    while frontier:
+        (d,c) = heapq.heappop(frontier)
+        if field[c] >= 0:
+            continue
+        field[c] = d
+        for (n,w) in zip(neighbours[c], steps[c]):
+            if n >= 0 and field[n] < 0 and d + w < dist.get(n, math.inf):
+                dist[n] = d + w
+                heapq.heappush(frontier, (d + w, n))
+    return field.reshape(grid.shape)
+
+
+def field_path(field, start, costs=None):
+    """ descend le gradient du champ depuis start jusqu'à la source
+        (champ vers la source : distance_field, ou dial_field avec
+        reverse=True si costs est donné)
+        retourne la liste des positions de start à la source (incluses),
+        [start] si la source n'est pas accessible depuis start
+        """
+    (nb_rows,nb_cols) = field.shape
+    path = [tuple(start)]
+    (x,y) = path[0]
+    d = field[x,y]
+    if d < 0:
+        return path
+    while d > 0:
+        for (inc_x,inc_y) in MOVES:
+            (u,v) = (x+inc_x,y+inc_y)
+            if 0 <= u < nb_rows and 0 <= v < nb_cols and field[u,v] >= 0:
+                w = 1 if costs is None else costs[u,v]
+                if field[u,v] == d-w:
+                    break
+        (x,y) = (u,v)
+        d = field[x,y]
+        path.append((x,y))
+    return path
@@ -11,6 +11,8 @@ import heapq
 from abc import ABCMeta, abstractmethod
 import search.probleme as probleme
 from search.probleme import Probleme
+from search.landmarks import get_landmarks
+from search.fields import MOVE_COSTS, diagonal_allowed, grid_moves
 
 
 
@@ -24,6 +26,16 @@ def distManhattan(p1,p2):
     return abs(x1-x2)+abs(y1-y2) 
 
 
+def distOctile(p1,p2,move_costs=MOVE_COSTS):
+    """ calcule la distance octile entre le tuple p1 et le tuple p2
+        (longueur d'un plus court chemin en 8-connexité sans obstacle)
+        """
+    (x1,y1)=p1
+    (x2,y2)=p2
+    (dx,dy)=(abs(x1-x2),abs(y1-y2))
+    return move_costs[0]*abs(dx-dy) + move_costs[1]*min(dx,dy)
+
+
     
 ###############################################################################
 
@@ -33,20 +45,42 @@ class ProblemeGrid2D(Probleme):
         - un état initial
         - un état but
         - une grid, donné comme un array booléen (False: obstacle)
-        - une heuristique (supporte Manhattan, euclidienne)
+        - une heuristique (supporte Manhattan, octile, euclidienne, ALT)
+        - éventuellement une grille d'entiers des coûts d'entrée dans
+          chaque case (cf. search.terrain), tous les coûts valent 1 sinon
+        - la connexité : 4 (déplacements orthogonaux) ou 8 (diagonales
+          en plus, de coûts move_costs, cf. search.fields ; corner_cutting
+          autorise une diagonale à longer le coin d'un obstacle)
         """ 
-    def __init__(self,init,but,grid,heuristique):
+    def __init__(self,init,but,grid,heuristique,costs=None,
+                 connectivity=4,move_costs=MOVE_COSTS,corner_cutting=False):
             self.init=init
             self.but=but
             self.grid=grid
             self.heuristique=heuristique
+            self.costs=costs
+            self.landmarks=None
+            self.connectivity=connectivity
+            self.move_costs=move_costs
+            self.corner_cutting=corner_cutting
+            self.moves=grid_moves(connectivity)
+            # Manhattan surestime les diagonales, les repères ALT sont
+            # calculés en 4-connexité : ni l'une ni l'autre n'est admissible
+            if connectivity == 8 and heuristique in ('manhattan','alt'):
+                raise ValueError(f"Heuristique {heuristique} non admissible "
+                                 f"en 8-connexité (utiliser 'octile')")
         
     
     def cost(self,e1,e2):
         """ donne le cout d'une action entre e1 et e2, 
-            toujours 1 pour le taquin
+            toujours 1 pour le taquin, coût d'entrée dans e2 si la grille
+            est pondérée, multiplié par le coût du pas en 8-connexité
             """
-        return 1
+        c = 1 if self.costs is None else int(self.costs[e2])
+        if self.connectivity == 4:
+            return c
+        diagonal = e1[0] != e2[0] and e1[1] != e2[1]
+        return c * self.move_costs[1 if diagonal else 0]
         
     def estBut(self,e):
         """ retourne vrai si l'état e est un état but
@@ -71,9 +105,25 @@ class ProblemeGrid2D(Probleme):
             """ retourne des positions successeurs possibles
                 """
             current_x,current_y = etat
-            d = [(0,1),(1,0),(0,-1),(-1,0)]
+            d = self.moves
             etatsApresMove = [(current_x+inc_x,current_y+inc_y) for (inc_x,inc_y) in d]
-            return [e for e in etatsApresMove if not(self.estDehors(e)) and not(self.estObstacle(e))]
+            succ = [e for e in etatsApresMove if not(self.estDehors(e)) and not(self.estObstacle(e))]
+            if self.connectivity == 4:
+                return succ
+            # pas de diagonale à travers un coin
+            return [e for e in succ if e[0] == current_x or e[1] == current_y or
+                    diagonal_allowed(self.grid,etat,(e[0]-current_x,e[1]-current_y),
+                                     self.corner_cutting)]
+
+    def predecesseurs(self,etat):
+            """ retourne des positions prédécesseurs possibles : les
+                mêmes que les successeurs (les déplacements sont
+                réversibles), mais les coûts ne sont pas symétriques avec
+                une grille de coûts (cost(e,s) dépend de la case d'arrivée
+                s), d'où l'appel à cost(s,e) dans la recherche arrière de
+                bidirectional_astar
+                """
+            return self.successeurs(etat)
 
     def immatriculation(self,etat):
         """ génère une chaine permettant d'identifier un état de manière unique
@@ -88,8 +138,15 @@ class ProblemeGrid2D(Probleme):
             """
         if self.heuristique=='manhattan':
             h = distManhattan(e1,e2)
+        elif self.heuristique=='octile':
+            h = distOctile(e1,e2,self.move_costs)
         elif self.heuristique=='uniform':
             h = 1
+        elif self.heuristique=='alt':
+            # repères calculés une fois par grille (cf. search.landmarks)
+            if self.landmarks is None:
+                self.landmarks = get_landmarks(self.grid)
+            h = max(distManhattan(e1,e2),self.landmarks.h_value(e1,e2))
         return h
 
 
@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+"""
+A* sur indices de cases pour ProblemeGrid2D
+
+Les cases sont indicées à plat (cf. search.fields). La table des voisins et
+l'ordre des cases sont précalculés une fois par grille ; g et les pères
+sont stockés dans des arrays numpy. Les noeuds de la frontière sont
+ordonnés par une clé entière (f, rang de la case) qui reproduit l'ordre de
+Noeud (comparaison des chaînes "(x, y)valeur=g") : les chemins trouvés
+sont identiques à ceux de probleme.astar. Seule exception, l'heuristique
+ALT départage d'abord les noeuds de même f par leur profondeur (chemins
+optimaux, mais pas forcément les mêmes).
+"""
+
+import heapq
+import time
+import numpy as np
+
+from search.fields import neighbour_lists, per_grid_cache
+from search.landmarks import get_landmarks
+from search.grid2D import ProblemeGrid2D
+from search.probleme import SearchResult
+
+
+# heuristiques supportées
+HEURISTIQUES = ('manhattan', 'uniform', 'alt')
+
+
+class GridIndex:
+    """ données précalculées d'une grille : voisins et rang de chaque case
+        dans l'ordre des chaînes str((x, y))
+        """
+
+    def __init__(self,grid):
+        self.shape = grid.shape
+        (nb_rows,nb_cols) = grid.shape
+        self.nb_cols = nb_cols
+        self.size = grid.size
+        self.neighbours = neighbour_lists(grid)
+        # "(x, y)" < "(u, v)" ssi (str(x)+',', str(y)+')') < (str(u)+',',
+        # str(v)+')') : on classe séparément lignes et colonnes
+        rank_x = np.argsort(np.argsort([str(x)+',' for x in range(nb_rows)]))
+        rank_y = np.argsort(np.argsort([str(y)+')' for y in range(nb_cols)]))
+        self.ranks = (rank_x[:,None] * nb_cols + rank_y[None,:]).ravel().tolist()
+
+
+@per_grid_cache
+def grid_index(grid):
+    """ retourne l'index de la grille, calculé une seule fois par grille
+        """
+    return GridIndex(grid)
+
+
+def supports(p):
+    """ retourne vrai si le probleme p peut être résolu par ce moteur :
+        ProblemeGrid2D dont les coûts, successeurs et heuristique n'ont
+        pas été redéfinis, à coûts unitaires et en 4-connexité
+        """
+    t = type(p)
+    return (isinstance(p, ProblemeGrid2D) and
+            t.cost is ProblemeGrid2D.cost and
+            t.successeurs is ProblemeGrid2D.successeurs and
+            t.estBut is ProblemeGrid2D.estBut and
+            t.h_value is ProblemeGrid2D.h_value and
+            getattr(p, 'costs', None) is None and
+            getattr(p, 'connectivity', 4) == 4 and
+            p.heuristique in HEURISTIQUES)
+
+
+class _Entree:
+    """ entrée de la frontière (case, g, case du père)
+        deux entrées de même clé sont égales pour le tas, comme deux
+        Noeud de même chaîne
+        """
+    __slots__ = ('cell','g','parent')
+
+    def __init__(self,cell,g,parent):
+        self.cell = cell
+        self.g = g
+        self.parent = parent
+
+    def __lt__(self,other):
+        return False
+
+
+def astar(p):
+    """ application de l'algorithme a-star sur un ProblemeGrid2D
+        retourne le chemin de l'état initial au dernier noeud développé
+        (le but s'il est accessible), avec les statistiques de la recherche
+        (SearchResult)
+        """
+    startTime = time.time()
+    index = grid_index(p.grid)
+    nb_cols = index.nb_cols
+    size = index.size
+    ranks = index.ranks
+    neighbours = index.neighbours
+    (x,y) = (int(p.init[0]),int(p.init[1]))
+    start = x * nb_cols + y
+    (gx,gy) = (int(p.but[0]),int(p.but[1]))
+    goal = gx * nb_cols + gy
+    if not (0 <= gx < index.shape[0] and 0 <= gy < nb_cols):
+        goal = -1
+    manhattan = p.heuristique == 'manhattan'
+    hs = None
+    if p.heuristique == 'alt':
+        # heuristique de chaque case, calculée d'un bloc pour ce but
+        if p.landmarks is None:
+            p.landmarks = get_landmarks(p.grid)
+        (rows,cols) = np.divmod(np.arange(size), nb_cols)
+        hs = np.abs(rows - gx) + np.abs(cols - gy)
+        if goal >= 0:
+            hs = np.maximum(hs, p.landmarks.h_field((gx,gy)))
+        hs = hs.tolist()
+    heappush = heapq.heappush
+    heappop = heapq.heappop
+
+    # g des noeuds développés (-1 : pas encore développé) et père
+    g = np.full(size, -1, dtype=np.int64)
+    parent = np.full(size, -1, dtype=np.int64)
+
+    best = _Entree(start, 0, -1)
+    if hs is not None:
+        # ALT : à f égal, les noeuds les plus profonds (h le plus faible)
+        # sont développés d'abord, sinon les nombreux noeuds de même f
+        # d'un couloir large sont tous développés
+        frontiere = [(((hs[start] * size) + size-1) * size + ranks[start], best)]
+    else:
+        h = abs(x-gx) + abs(y-gy) if manhattan else 1
+        frontiere = [(h * size + ranks[start], best)]
+    nodes_expanded = 0
+    frontier_peak = 1
+    reopenings = 0
+    while frontiere and best.cell != goal:
+        best = heappop(frontiere)[1]
+        c = best.cell
+        if g[c] < 0:
+            g[c] = best.g
+            parent[c] = best.parent
+            nodes_expanded += 1
+            gn = best.g + 1
+            for n in neighbours[c]:
+                if hs is not None:
+                    key = ((gn + hs[n]) * size + size-1-gn) * size + ranks[n]
+                else:
+                    if manhattan:
+                        (nx,ny) = divmod(n, nb_cols)
+                        h = abs(nx-gx) + abs(ny-gy)
+                    key = (gn + h) * size + ranks[n]
+                heappush(frontiere, (key, _Entree(n, gn, c)))
+            if len(frontiere) > frontier_peak:
+                frontier_peak = len(frontiere)
+        else:
+            reopenings += 1
+
+    cells = [best.cell]
+    c = best.parent
+    while c >= 0:
+        cells.append(c)
+        c = int(parent[c])
+    path = [divmod(c, nb_cols) for c in reversed(cells)]
+    path[0] = p.init
+    return SearchResult(path,
+                        nodes_expanded=nodes_expanded,
+                        frontier_peak=frontier_peak,
+                        reopenings=reopenings,
+                        time=time.time() - startTime)
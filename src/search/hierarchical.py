@@ -0,0 +1,360 @@
+# -*- coding: utf-8 -*-
+"""
+Planification hiérarchique (HPA*)
+
+Les secteurs sont détectés sur la grille des obstacles. Une porte est une
+suite de cases libres, sur une ligne ou une colonne, d'au plus max_door
+cases, comprise entre deux bouts de mur : murs alignés avec la porte ou
+extrémités de murs perpendiculaires. Les secteurs sont les composantes
+connexes des cases libres une fois les portes retirées, chaque case de
+porte étant ensuite rattachée à un secteur voisin. Toute paire de cases
+voisines de deux secteurs différents est une transition, et les distances
+intra-secteur entre transitions sont précalculées une fois par grille : le
+coût d'un chemin du graphe abstrait est ainsi celui d'un plus court chemin
+de la grille. Une requête est résolue sur le graphe abstrait, puis le
+chemin est déroulé paresseusement, segment par segment, au fur et à mesure
+qu'on le parcourt.
+"""
+
+import heapq
+import time
+import numpy as np
+
+from search.fields import (MOVES, dial_field, distance_field, field_path, 
+                           neighbour_table)
+
+
+# largeur maximale d'une porte
+MAX_DOOR = 10
+
+
+def _wall_ends(obstacles):
+    """ bouts de mur (cf. doors) pour des portes horizontales : obstacles
+        prolongés par un obstacle sur la ligne, ou extrémités d'un mur
+        vertical ; l'extérieur de la grille ne compte pas comme obstacle
+        """
+    padded = np.pad(obstacles, 1)
+    left = padded[1:-1,:-2]
+    right = padded[1:-1,2:]
+    up = padded[:-2,1:-1]
+    down = padded[2:,1:-1]
+    return obstacles & (left | right | (up ^ down))
+
+
+def _row_doors(grid,max_door):
+    """ cases des portes horizontales de la grille (array booléen)
+        """
+    (nb_rows,nb_cols) = grid.shape
+    ends = _wall_ends(~grid)
+    # suites de cases libres de chaque ligne, bordées par des obstacles
+    # fictifs : une suite commence en start et finit avant stop
+    free = np.pad(grid, ((0,0),(1,1))).astype(np.int8)
+    step = np.diff(free, axis=1)
+    (rows,starts) = np.nonzero(step == 1)
+    (_,stops) = np.nonzero(step == -1)
+    keep = ((starts > 0) & (stops < nb_cols) & (stops - starts <= max_door))
+    (rows,starts,stops) = (rows[keep],starts[keep],stops[keep])
+    keep = ends[rows,starts-1] & ends[rows,stops]
+    (rows,starts,stops) = (rows[keep],starts[keep],stops[keep])
+    marks = np.zeros((nb_rows,nb_cols+1), dtype=np.int64)
+    np.add.at(marks, (rows,starts), 1)
+    np.add.at(marks, (rows,stops), -1)
+    return np.cumsum(marks, axis=1)[:,:-1] > 0
+
+
+def doors(grid,max_door=MAX_DOOR):
+    """ retourne l'array booléen des cases de porte de la grille (cf.
+        l'en-tête du module)
+        """
+    return _row_doors(grid, max_door) | _row_doors(grid.T, max_door).T
+
+
+def sector_labels(grid,max_door=MAX_DOOR):
+    """ retourne le numéro de secteur de chaque case (-1 pour les
+        obstacles) et le nombre de secteurs
+        """
+    (nb_rows,nb_cols) = grid.shape
+    door = doors(grid, max_door)
+    labels = np.full(grid.shape, -1, dtype=np.int64)
+    nb_labels = _label_components(grid & ~door, labels, 0)
+    # rattachement des cases de porte au premier secteur voisin, dans
+    # l'ordre des déplacements
+    todo = door.copy()
+    while todo.any():
+        (xs,ys) = np.nonzero(todo)
+        found = np.full(len(xs), -1, dtype=np.int64)
+        for (dx,dy) in MOVES:
+            (u,v) = (xs + dx,ys + dy)
+            inside = (u >= 0) & (u < nb_rows) & (v >= 0) & (v < nb_cols)
+            near = np.full(len(xs), -1, dtype=np.int64)
+            near[inside] = labels[u[inside],v[inside]]
+            found = np.where(found >= 0, found, near)
+        if not (found >= 0).any():
+            break
+        attached = found >= 0
+        labels[xs[attached],ys[attached]] = found[attached]
+        todo[xs[attached],ys[attached]] = False
+    # portes isolées : secteurs à part entière
+    nb_labels = _label_components(todo, labels, nb_labels)
+    return labels, nb_labels
+
+
+def _label_components(mask,labels,first):
+    """ numérote à partir de first les composantes connexes des cases de
+        mask, dans labels, dans l'ordre de leur première case ; retourne
+        le numéro suivant
+        """
+    (nb_rows,nb_cols) = mask.shape
+    # chaque case prend le plus petit indice de ses voisines de mask, puis
+    # celui de la case qu'elle désigne (saut de pointeurs), jusqu'à ce que
+    # chaque composante désigne sa première case
+    big = mask.size
+    roots = np.where(mask, np.arange(big).reshape(mask.shape), big)
+    while True:
+        padded = np.pad(roots, 1, constant_values=big)
+        new = roots.copy()
+        for (dx,dy) in MOVES:
+            near = padded[1+dx:1+dx+nb_rows,1+dy:1+dy+nb_cols]
+            new = np.minimum(new, np.where(mask, near, big))
+        flat = new[mask]
+        new[mask] = new.reshape(-1)[flat]
+        if np.array_equal(new, roots):
+            break
+        roots = new
+    (firsts,numbers) = np.unique(roots[mask], return_inverse=True)
+    labels[mask] = first + numbers
+    return first + len(firsts)
+
+
+class _Cluster:
+    """ secteur : cases de mask dans le rectangle [r0, r1[ x [c0, c1[, et
+        ses transitions
+        """
+
+    def __init__(self,r0,r1,c0,c1,mask):
+        (self.r0,self.r1,self.c0,self.c1) = (r0,r1,c0,c1)
+        self.mask = mask
+        self.entrances = []
+        # champ de chaque transition : coût de chaque case du secteur
+        # jusqu'à la transition, en restant dans le secteur
+        self.fields = {}
+
+
+class HierarchicalPlanner:
+    """ graphe abstrait des secteurs d'une grille (array booléen, False:
+        obstacle), éventuellement pondérée par une grille de coûts
+        d'entrée dans chaque case
+        """
+
+    def __init__(self,grid,max_door=MAX_DOOR,costs=None):
+        self.grid = grid
+        self.costs = costs
+        (self.nb_rows,self.nb_cols) = grid.shape
+        (self.labels,nb_labels) = sector_labels(grid, max_door)
+        self.clusters = []
+        (xs,ys) = np.nonzero(self.labels >= 0)
+        order = np.argsort(self.labels[xs,ys], kind='stable')
+        bounds = np.searchsorted(self.labels[xs,ys][order],
+                                 np.arange(nb_labels + 1))
+        for k in range(nb_labels):
+            members = order[bounds[k]:bounds[k+1]]
+            (r0,r1) = (int(xs[members].min()),int(xs[members].max()) + 1)
+            (c0,c1) = (int(ys[members].min()),int(ys[members].max()) + 1)
+            mask = self.labels[r0:r1,c0:c1] == k
+            self.clusters.append(_Cluster(r0, r1, c0, c1, mask))
+        # arêtes du graphe abstrait : case -> liste de (case, coût, secteur)
+        # (secteur None pour le passage d'une transition)
+        self.edges = {}
+        self._detect_entrances()
+        for cluster in self.clusters:
+            neighbours = neighbour_table(cluster.mask)
+            for e in cluster.entrances:
+                cluster.fields[e] = self._local_field(cluster, e, neighbours)
+            for a in cluster.entrances:
+                for b in cluster.entrances:
+                    d = cluster.fields[b][self._local(cluster, a)]
+                    if a != b and d >= 0:
+                        self.edges[a].append((b, int(d), cluster))
+        # segments déjà déroulés, partagés par toutes les requêtes
+        self.segments = {}
+
+    def cluster_of(self,etat):
+        """ retourne le secteur contenant la case etat
+            """
+        return self.clusters[self.labels[etat]]
+
+    def _cost(self,etat):
+        return 1 if self.costs is None else int(self.costs[etat])
+
+    def _local(self,cluster,etat):
+        return (etat[0] - cluster.r0, etat[1] - cluster.c0)
+
+    def _local_field(self,cluster,etat,neighbours=None):
+        """ coût de chaque case du secteur jusqu'à etat, sans en sortir
+            """
+        source = self._local(cluster, etat)
+        if self.costs is None:
+            return distance_field(cluster.mask, source, neighbours)
+        costs = self.costs[cluster.r0:cluster.r1, cluster.c0:cluster.c1]
+        return dial_field(cluster.mask, costs, source, reverse=True)
+
+    def _add_transition(self,a,b):
+        """ ajoute la transition entre les cases voisines a et b
+            """
+        for (u,v) in ((a,b),(b,a)):
+            cluster = self.cluster_of(u)
+            if u not in self.edges:
+                self.edges[u] = []
+                cluster.entrances.append(u)
+            self.edges[u].append((v, self._cost(v), None))
+
+    def _detect_entrances(self):
+        # toutes les paires de cases voisines (horizontalement puis
+        # verticalement) de deux secteurs différents
+        labels = self.labels
+        pairs = [((0,1),labels[:,:-1],labels[:,1:]),
+                 ((1,0),labels[:-1,:],labels[1:,:])]
+        for ((dx,dy),a,b) in pairs:
+            (xs,ys) = np.nonzero((a >= 0) & (b >= 0) & (a != b))
+            for (x,y) in zip(xs.tolist(), ys.tolist()):
+                self._add_transition((x,y), (x+dx,y+dy))
+
+    def _search(self,init,but):
+        """ recherche sur le graphe abstrait, de init à but
+            retourne la liste des segments (départ, arrivée, secteur, champ)
+            et le coût du chemin, ([], inf) si but est inaccessible
+            """
+        start_cluster = self.cluster_of(init)
+        goal_cluster = self.cluster_of(but)
+        goal_field = self._local_field(goal_cluster, but)
+        # arêtes temporaires du départ et vers le but
+        start_edges = []
+        for e in start_cluster.entrances:
+            d = start_cluster.fields[e][self._local(start_cluster, init)]
+            if d >= 0:
+                start_edges.append((e, int(d), start_cluster))
+        if start_cluster is goal_cluster:
+            d = goal_field[self._local(goal_cluster, init)]
+            if d >= 0:
+                start_edges.append((but, int(d), goal_cluster))
+        goal_edges = {}
+        for e in goal_cluster.entrances:
+            d = goal_field[self._local(goal_cluster, e)]
+            if d >= 0:
+                goal_edges[e] = int(d)
+
+        (gx,gy) = but
+        def h(etat):
+            return abs(etat[0]-gx) + abs(etat[1]-gy)
+
+        best = {init: 0}
+        parent = {init: None}
+        counter = 0
+        frontiere = [(h(init), counter, init)]
+        reserve = set()
+        while frontiere:
+            (_,_,u) = heapq.heappop(frontiere)
+            if u == but:
+                break
+            if u in reserve:
+                continue
+            reserve.add(u)
+            succ = list(self.edges.get(u, []))
+            if u == init:
+                succ += start_edges
+            if u in goal_edges:
+                succ.append((but, goal_edges[u], goal_cluster))
+            for (v,d,cluster) in succ:
+                gv = best[u] + d
+                if gv < best.get(v, float('inf')):
+                    best[v] = gv
+                    parent[v] = (u, cluster)
+                    counter += 1
+                    heapq.heappush(frontiere, (gv + h(v), counter, v))
+        if but not in parent:
+            return [], float('inf')
+        segments = []
+        v = but
+        while parent[v] is not None:
+            (u,cluster) = parent[v]
+            field = goal_field if v == but else None
+            segments.append((u, v, cluster, field))
+            v = u
+        segments.reverse()
+        return segments, best[but]
+
+    def _refine(self,a,b,cluster,field=None):
+        """ cases du segment de a à b (a exclu), field : champ de b dans
+            le secteur s'il ne s'agit pas d'une porte
+            """
+        if cluster is None:
+            return [b]
+        key = (a, b)
+        if field is None and key in self.segments:
+            return self.segments[key]
+        if field is None:
+            field = cluster.fields[b]
+        costs = (None if self.costs is None else
+                 self.costs[cluster.r0:cluster.r1, cluster.c0:cluster.c1])
+        local = field_path(field, self._local(cluster, a), costs)
+        cells = [(x + cluster.r0, y + cluster.c0) for (x,y) in local[1:]]
+        if a in cluster.fields and b in cluster.fields:
+            # seuls les segments entre portes sont réutilisables
+            self.segments[key] = cells
+        return cells
+
+    def path(self,init,but):
+        """ retourne le chemin de init à but, déroulé à la demande
+            (LazyPath), réduit à init si but est inaccessible
+            """
+        startTime = time.time()
+        init = (int(init[0]),int(init[1]))
+        but = (int(but[0]),int(but[1]))
+        if init == but or not self.grid[init] or not self.grid[but]:
+            segments, cost = [], (0 if init == but else float('inf'))
+        else:
+            segments, cost = self._search(init, but)
+        return LazyPath(self, init, segments, cost, time.time() - startTime)
+
+
+class LazyPath:
+    """ chemin case par case dont les segments intra-secteur ne sont
+        déroulés qu'au moment où on y accède
+        """
+
+    def __init__(self,planner,init,segments,cost,time=0.):
+        self.planner = planner
+        self.cells = [init]
+        self.segments = list(segments)
+        self.cost = cost
+        self.time = time
+
+    def _refine_until(self,index):
+        while self.segments and (index < 0 or index >= len(self.cells)):
+            self.cells.extend(self.planner._refine(*self.segments.pop(0)))
+
+    def __getitem__(self,index):
+        if isinstance(index, slice):
+            self._refine_until(-1)
+        else:
+            self._refine_until(index)
+        return self.cells[index]
+
+    def __len__(self):
+        self._refine_until(-1)
+        return len(self.cells)
+
+    def __iter__(self):
+        k = 0
+        while True:
+            self._refine_until(k)
+            if k >= len(self.cells):
+                return
+            yield self.cells[k]
+            k += 1
+
+    def __eq__(self,other):
+        return list(self) == list(other)
+
+    def __repr__(self):
+        return repr(list(self))
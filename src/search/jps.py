@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+"""
+Jump Point Search pour les grilles 4-connexes à coûts uniformes
+
+Les déplacements horizontaux sont des lignes droites : on saute tant
+qu'aucun voisin forcé n'apparaît (case libre au-dessus ou au-dessous dont la
+case précédente était un obstacle). Les déplacements verticaux jouent le
+rôle des diagonales de la version 8-connexe : à chaque pas vertical, on
+lance les sauts horizontaux des deux côtés, et la case devient un point de
+saut si l'un d'eux aboutit. Seuls les points de saut passent par le tas ;
+le chemin retourné est ensuite déroulé case par case.
+"""
+
+import heapq
+import time
+
+from search.fields import per_grid_cache
+from search.probleme import SearchResult
+
+
+# directions (ligne, colonne) explorées depuis l'état initial, dans l'ordre
+# de ProblemeGrid2D.successeurs
+DIRECTIONS = [(0,1),(1,0),(0,-1),(-1,0)]
+
+
+class _PaddedGrid:
+    """ grille à plat entourée d'une bordure d'obstacles : plus aucun test
+        de sortie de grille n'est nécessaire
+        """
+
+    def __init__(self,grid):
+        (nb_rows,nb_cols) = grid.shape
+        self.width = nb_cols + 2
+        self.free = [False] * (self.width * (nb_rows + 2))
+        for (x,y) in zip(*grid.nonzero()):
+            self.free[(int(x)+1) * self.width + int(y)+1] = True
+
+
+_padded = per_grid_cache(_PaddedGrid)
+
+
+def jps(p):
+    """ application de Jump Point Search sur un ProblemeGrid2D (coûts
+        unitaires, 4-connexité)
+        retourne le chemin complet, case par case, de l'état initial au
+        but (SearchResult) ; le chemin est réduit à l'état initial si le
+        but est inaccessible
+        """
+    if getattr(p, 'connectivity', 4) != 4:
+        raise ValueError("Jump Point Search n'est implémenté qu'en 4-connexité")
+    startTime = time.time()
+    padded = _padded(p.grid)
+    free = padded.free
+    W = padded.width
+    (x,y) = (int(p.init[0]),int(p.init[1]))
+    (gx,gy) = (int(p.but[0]),int(p.but[1]))
+    start = (x+1) * W + y+1
+    goal = (gx+1) * W + gy+1
+    (nb_rows,nb_cols) = p.grid.shape
+    if not (0 <= gx < nb_rows and 0 <= gy < nb_cols):
+        goal = -1
+
+    def h(c):
+        (cx,cy) = divmod(c, W)
+        return abs(cx-1-gx) + abs(cy-1-gy)
+
+    def jump_horizontal(c, dc):
+        """ saut horizontal depuis c (exclu), retourne le point de saut
+            atteint ou -1
+            """
+        while True:
+            c += dc
+            if not free[c]:
+                return -1
+            if c == goal:
+                return c
+            # voisin forcé au-dessus ou au-dessous
+            if ((free[c-W] and not free[c-W-dc]) or
+                (free[c+W] and not free[c+W-dc])):
+                return c
+
+    def jump_vertical(c, dr):
+        """ saut vertical depuis c (exclu), retourne le point de saut
+            atteint ou -1
+            """
+        while True:
+            c += dr
+            if not free[c]:
+                return -1
+            if c == goal:
+                return c
+            # voisin forcé à gauche ou à droite
+            if ((free[c-1] and not free[c-1-dr]) or
+                (free[c+1] and not free[c+1-dr])):
+                return c
+            if jump_horizontal(c, 1) >= 0 or jump_horizontal(c, -1) >= 0:
+                return c
+
+    def directions(c, d):
+        """ directions à explorer depuis le point de saut c atteint selon
+            la direction d (None pour l'état initial)
+            """
+        if d is None:
+            return [dr * W + dc for (dr,dc) in DIRECTIONS]
+        if d in (1,-1):
+            dirs = [d]
+            if free[c-W] and not free[c-W-d]:
+                dirs.append(-W)
+            if free[c+W] and not free[c+W-d]:
+                dirs.append(W)
+            return dirs
+        dirs = [d,1,-1]
+        return dirs
+
+    g = {start: 0}
+    parent = {start: -1}
+    closed = set()
+    counter = 0
+    frontiere = [(h(start), counter, start, None)]
+    nodes_expanded = 0
+    frontier_peak = 1
+    reopenings = 0
+    found = start == goal
+    while frontiere and not found:
+        (_,_,c,d) = heapq.heappop(frontiere)
+        if c in closed:
+            reopenings += 1
+            continue
+        if c == goal:
+            found = True
+            break
+        closed.add(c)
+        nodes_expanded += 1
+        for k in directions(c, d):
+            if k in (1,-1):
+                j = jump_horizontal(c, k)
+            else:
+                j = jump_vertical(c, k)
+            if j < 0 or j in closed:
+                continue
+            gj = g[c] + abs(j - c) // abs(k)
+            if gj < g.get(j, gj + 1):
+                g[j] = gj
+                parent[j] = c
+                counter += 1
+                heapq.heappush(frontiere, (gj + h(j), counter, j, k))
+        if len(frontiere) > frontier_peak:
+            frontier_peak = len(frontiere)
+
+    path = [p.init]
+    if found and goal != start:
+        # points de saut, du but à l'état initial
+        jumps = [goal]
+        while parent[jumps[-1]] >= 0:
+            jumps.append(parent[jumps[-1]])
+        jumps.reverse()
+        # déroulement des segments droits entre points de saut
+        for (a,b) in zip(jumps, jumps[1:]):
+            step = (1 if b > a else -1) * (1 if abs(b - a) < W else W)
+            for c in range(a + step, b + step, step):
+                (cx,cy) = divmod(c, W)
+                path.append((cx-1,cy-1))
+    return SearchResult(path,
+                        nodes_expanded=nodes_expanded,
+                        frontier_peak=frontier_peak,
+                        reopenings=reopenings,
+                        time=time.time() - startTime)
@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+"""
+Heuristique ALT (A*, Landmarks, inégalité Triangulaire)
+
+On calcule une fois par grille les distances exactes depuis quelques cases
+repères (landmarks), choisies par le point le plus éloigné. Pour tout repère
+L, |d(L, a) - d(L, b)| <= d(a, b) : le maximum de ces bornes sur les repères
+est une heuristique admissible et consistante, bien plus informée que la
+distance de Manhattan sur les cartes aux longs couloirs.
+"""
+
+import numpy as np
+
+from search.fields import distance_field, neighbour_table, per_grid_cache
+
+
+# nombre de repères par défaut
+NB_LANDMARKS = 8
+
+
+class Landmarks:
+    """ repères d'une grille et distances depuis chacun d'eux
+        """
+
+    def __init__(self,grid,nb_landmarks=NB_LANDMARKS):
+        (_,self.nb_cols) = grid.shape
+        self.cells = []
+        neighbours = neighbour_table(grid)
+        free = np.flatnonzero(grid.ravel())
+        fields = []
+        if len(free) > 0:
+            # premier repère : la case la plus éloignée de la première case
+            # libre, puis la case la plus éloignée des repères déjà choisis
+            # (les cases qu'aucun repère n'atteint sont à l'infini : chaque
+            # composante connexe reçoit au moins un repère)
+            first = divmod(int(free[0]), self.nb_cols)
+            field = distance_field(grid, first, neighbours).ravel()
+            nearest = np.full(grid.size, -np.inf)
+            nearest[free] = np.inf
+            nearest[field >= 0] = field[field >= 0]
+            for _ in range(min(nb_landmarks, len(free))):
+                c = int(np.argmax(nearest))
+                if nearest[c] <= 0:
+                    break
+                self.cells.append(divmod(c, self.nb_cols))
+                field = distance_field(grid, self.cells[-1], neighbours).ravel()
+                fields.append(field)
+                reached = field >= 0
+                nearest[reached] = np.minimum(nearest[reached], field[reached])
+        # distances[k, c] : distance du repère k à la case c (-1 si la case
+        # n'est pas accessible depuis le repère)
+        self.distances = np.zeros((len(fields),grid.size), dtype=np.int64)
+        for k,field in enumerate(fields):
+            self.distances[k] = field
+
+    def h_value(self,e1,e2):
+        """ borne inférieure de la distance entre le tuple e1 et le tuple e2
+            """
+        a = self.distances[:, e1[0] * self.nb_cols + e1[1]]
+        b = self.distances[:, e2[0] * self.nb_cols + e2[1]]
+        known = (a >= 0) & (b >= 0)
+        if not known.any():
+            return 0
+        return int(np.abs(a - b)[known].max())
+
+    def h_field(self,but):
+        """ borne inférieure de la distance de chaque case au tuple but
+            (array à plat)
+            """
+        if len(self.distances) == 0:
+            return np.zeros(self.distances.shape[1], dtype=np.int64)
+        b = self.distances[:, but[0] * self.nb_cols + but[1]]
+        known = (self.distances >= 0) & (b[:,None] >= 0)
+        bounds = np.where(known, np.abs(self.distances - b[:,None]), 0)
+        return bounds.max(axis=0)
+
+
+@per_grid_cache
+def _landmarks(grid,nb_landmarks):
+    return Landmarks(grid, nb_landmarks)
+
+
+def get_landmarks(grid,nb_landmarks=NB_LANDMARKS):
+    """ retourne les repères de la grille, calculés une seule fois par
+        grille
+        """
+    return _landmarks(grid, nb_landmarks)
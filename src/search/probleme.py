@@ -49,6 +49,12 @@ class Probleme(object):
             """
         pass
         
+    def predecesseurs(self,etat):
+        """ retourne une liste avec les prédécesseurs possibles
+            (nécessaire pour la recherche bidirectionnelle)
+            """
+        raise NotImplementedError
+        
     @abstractmethod
     def immatriculation(self,etat):
         """ génère une chaine permettant d'identifier un état de manière unique
@@ -93,7 +99,7 @@ class Noeud:
         if len(nouveaux_fils)<k: 
             return []
         else: 
-            return self.expand(p)[k-1]
+            return nouveaux_fils[k-1]
             
     def trace(self,p):
         """ affiche tous les ancetres du noeud
@@ -110,20 +116,80 @@ class Noeud:
         
 ###############################################################################
 
+class SearchResult(list):
+    """ chemin trouvé par une recherche (liste d'états), accompagné des
+        statistiques de la recherche :
+        - nodes_expanded : nombre de noeuds développés
+        - frontier_peak : taille maximale de la frontière
+        - reopenings : nombre de noeuds retirés de la frontière alors
+          qu'ils avaient déjà été développés
+        - time : temps de calcul, en secondes
+        """
+    def __init__(self,path=(),nodes_expanded=0,frontier_peak=0,reopenings=0,time=0.):
+        list.__init__(self,path)
+        self.nodes_expanded = nodes_expanded
+        self.frontier_peak = frontier_peak
+        self.reopenings = reopenings
+        self.time = time
+
+    def stats(self):
+        """ retourne les statistiques de la recherche dans un dictionnaire
+            """
+        return {'nodes_expanded': self.nodes_expanded,
+                'frontier_peak': self.frontier_peak,
+                'reopenings': self.reopenings,
+                'time': self.time}
+
+
+def print_trace(path,p=None):
+    """ affiche les états d'un chemin du dernier au premier, avec leur
+        coût depuis l'état initial (même format que Noeud.trace)
+        sans probleme p, les coûts sont unitaires
+        """
+    couts = [0]
+    for (e1,e2) in zip(path,path[1:]):
+        couts.append(couts[-1] + (1 if p is None else p.cost(e1,e2)))
+    for k in range(len(path)-1,-1,-1):
+        print (str(path[k]) + "valeur=" + str(couts[k]))
+    print ("Nombre d'étapes de la solution:", len(path)-1)
+
 
-def astar(p,verbose=False,stepwise=False):
+###############################################################################
+
+
+def astar(p,verbose=False,stepwise=False,quiet=False):
     """
     application de l'algorithme a-star
     sur un probleme donné
+    quiet=True : aucun affichage
+    retourne le chemin trouvé (SearchResult)
         """
         
+    # grilles 2D : moteur sur indices de cases (mêmes chemins), ou
+    # algorithme de Dial si la grille est pondérée
+    if not stepwise and (quiet or not verbose):
+        from search import grid_astar
+        if grid_astar.supports(p):
+            path = grid_astar.astar(p)
+            if not quiet:
+                print_trace(path)
+            return path
+        from search import dial
+        if dial.supports(p):
+            path = dial.dial(p)
+            if not quiet:
+                print_trace(path,p)
+            return path
+
     startTime = time.time()
 
     nodeInit = Noeud(p.init,0,None)
-    frontiere = [(nodeInit.g+p.h_value(nodeInit.etat,p.but),nodeInit)] 
+    frontiere = [(nodeInit.g+p.h_value(nodeInit.etat,p.but),nodeInit)]
 
     reserve = {}        
     bestNoeud = nodeInit
+    frontier_peak = 1
+    reopenings = 0
     
     while frontiere != [] and not p.estBut(bestNoeud.etat):              
         (min_f,bestNoeud) = heapq.heappop(frontiere)
@@ -137,6 +203,9 @@ def astar(p,verbose=False,stepwise=False):
             for n in nouveauxNoeuds:
                 f = n.g+p.h_value(n.etat,p.but)
                 heapq.heappush(frontiere, (f,n))
+            frontier_peak = max(frontier_peak, len(frontiere))
+        else:
+            reopenings += 1
 
     # TODO: VERSION 2 --- Un noeud en réserve peut revenir dans la frontière        
         
@@ -149,12 +218,13 @@ def astar(p,verbose=False,stepwise=False):
             if stop_stepwise=="s":
                 stepwise=False
     
-    bestNoeud.trace(p)          
+    if not quiet:
+        bestNoeud.trace(p)          
             
     # Mode verbose            
     # Affichage des statistiques (approximatives) de recherche   
     #
-    if verbose:
+    if verbose and not quiet:
         print ("=------------------------------=")
         print ("Nombre de noeuds explorés", len(reserve))
         c=0
@@ -171,7 +241,118 @@ def astar(p,verbose=False,stepwise=False):
     while n!=None :
         path.append(n.etat)
         n = n.pere
-    return path[::-1] # extended slice notation to reverse list
+    return SearchResult(path[::-1], # extended slice notation to reverse list
+                        nodes_expanded=len(reserve),
+                        frontier_peak=frontier_peak,
+                        reopenings=reopenings,
+                        time=time.time() - startTime)
+
+
+
+###############################################################################
+# A* BIDIRECTIONNEL
+###############################################################################
+
+
+def bidirectional_astar(p,verbose=False,quiet=False):
+    """ application de l'algorithme a-star bidirectionnel sur un probleme
+        donné, qui doit savoir énumérer les prédécesseurs d'un état
+        une recherche part de l'état initial, l'autre du but ; la meilleure
+        rencontre est conservée et la recherche s'arrête dès que le plus
+        petit f de l'une des deux frontières atteint son coût
+        quiet=True : aucun affichage
+        retourne le chemin trouvé (SearchResult), réduit à l'état initial
+        si le but est inaccessible
+        """
+    
+    startTime = time.time()
+    
+    # recherche avant (0) depuis l'état initial, arrière (1) depuis le but
+    h = [lambda e: p.h_value(e,p.but), lambda e: p.h_value(p.init,e)]
+    voisins = [p.successeurs, p.predecesseurs]
+    racines = [p.init, p.but]
+    g = [{}, {}]
+    pere = [{}, {}]
+    etats = [{}, {}]
+    reserve = [set(), set()]
+    frontiere = [[], []]
+    compteur = 0
+    for d in (0,1):
+        e = racines[d]
+        k = p.immatriculation(e)
+        g[d][k] = 0
+        pere[d][k] = None
+        etats[d][k] = e
+        frontiere[d].append((h[d](e),compteur,k))
+    
+    # coût et immatriculation de la meilleure rencontre
+    mu = float('inf')
+    rencontre = None
+    k = p.immatriculation(p.init)
+    if p.estBut(p.init):
+        (mu,rencontre) = (0,k)
+    
+    nb_noeuds = 0
+    frontier_peak = 2
+    reopenings = 0
+    
+    while frontiere[0] and frontiere[1]:
+        if max(frontiere[0][0][0],frontiere[1][0][0]) >= mu:
+            break
+        # on développe la plus petite frontière
+        d = 0 if len(frontiere[0]) <= len(frontiere[1]) else 1
+        (_,_,k) = heapq.heappop(frontiere[d])
+        if k in reserve[d]:
+            reopenings += 1
+            continue
+        reserve[d].add(k)
+        nb_noeuds += 1
+        e = etats[d][k]
+        for s in voisins[d](e):
+            cout = p.cost(e,s) if d == 0 else p.cost(s,e)
+            gs = g[d][k] + cout
+            ks = p.immatriculation(s)
+            if ks in g[d] and g[d][ks] <= gs:
+                continue
+            g[d][ks] = gs
+            pere[d][ks] = k
+            etats[d][ks] = s
+            compteur += 1
+            heapq.heappush(frontiere[d],(gs + h[d](s),compteur,ks))
+            if ks in g[1-d] and gs + g[1-d][ks] < mu:
+                (mu,rencontre) = (gs + g[1-d][ks],ks)
+        frontier_peak = max(frontier_peak, len(frontiere[0]) + len(frontiere[1]))
+    
+    path = [p.init]
+    if rencontre is not None:
+        # de l'état initial à la rencontre, puis de la rencontre au but
+        avant = []
+        k = rencontre
+        while k is not None:
+            avant.append(etats[0][k])
+            k = pere[0][k]
+        arriere = []
+        k = pere[1][rencontre]
+        while k is not None:
+            arriere.append(etats[1][k])
+            k = pere[1][k]
+        path = avant[::-1] + arriere
+    
+    if not quiet:
+        print_trace(path,p)
+    
+    if verbose and not quiet:
+        print ("=------------------------------=")
+        print ("Nombre de noeuds explorés", nb_noeuds)
+        print ("Nombre de noeuds en mémoire:", len(g[0]) + len(g[1]))
+        print ("temps de calcul:", time.time() - startTime)
+        print ("=------------------------------=")
+    
+    return SearchResult(path,
+                        nodes_expanded=nb_noeuds,
+                        frontier_peak=frontier_peak,
+                        reopenings=reopenings,
+                        time=time.time() - startTime)
 
 
 
@@ -180,100 +361,112 @@ def astar(p,verbose=False,stepwise=False):
 ###############################################################################
 
 
-def idastar(p,verbose=False,stepwise=False):
+# nombre maximal d'états de la table de transposition d'une itération
+TABLE_SIZE = 1 << 20
+
+
+def idastar(p,verbose=False,stepwise=False,quiet=False,transposition=False):
     """ application de l'algorithme iterative deepening A*
         sur un probleme donné
+        la mémoire utilisée est celle du chemin en cours d'exploration (les
+        états du chemin sont dans un ensemble, pour éviter les cycles)
+        transposition=True : une table (bornée à TABLE_SIZE états) garde le
+        meilleur coût de chaque état atteint pendant l'itération, et coupe
+        les chemins qui y reviennent plus cher
+        quiet=True : aucun affichage
+        retourne le chemin trouvé (SearchResult), réduit à l'état initial
+        si le but est inaccessible
         """
         
     startTime = time.time()
     
-    nodeInit = Noeud(p.init,0,None)
-    MaxSeuil=1000
-    
-    front = [(nodeInit,1)]
-    seuil = p.h_value(nodeInit.etat,p.but)
-    nextSeuil = MaxSeuil
+    inf = float('inf')
+    seuil = p.h_value(p.init,p.but)
     
     nb_noeuds = 0
+    frontier_peak = 1
+    # noeuds générés par les itérations précédentes, générés à nouveau
+    reopenings = 0
+    path = None
    
-    while not (front==[] and nextSeuil==MaxSeuil) : 
+    while path is None:
+        nextSeuil = inf
+        table = {} if transposition else None
+        nb_iteration = 0
         
-        #print "frontiere", front
-        #raw_input("Press Enter to continue...")
-
-        if front==[]:
-            if stepwise:
-                    print("Augmentation du seuil:",nextSeuil)
-            seuil = nextSeuil
-            nextSeuil = MaxSeuil
-            nodeInit = Noeud(p.init,0,None)
-            front = [(nodeInit,1)]
-        (m,k) = front[-1]
-        
-        
-        if p.estBut(m.etat): 
-            print ("Solution trouvée")
-            break
+        # chemin en cours : états, coûts, successeurs restant à essayer
+        etats = [p.init]
+        couts = [0]
+        fils = [iter(p.successeurs(p.init))]
+        cles = [p.immatriculation(p.init)]
+        chemin = set(cles)
+        if p.estBut(p.init):
+            path = etats
         
-    
-        while True: 
-            nextNoeud = m.expandNext(p,k)
-            nb_noeuds +=1
-            if (nextNoeud,) not in front:
-                if stepwise:
-                    print (nextNoeud)
-                    print ("fils num. k:",k)
-                break
-            else:
-                k+=1
-        
-        if nextNoeud == []:                 # si pas de noeud à étendre, on pop
-            if front!=[]:
-                 front.pop()     
-        else:
-            f = nextNoeud.g+p.h_value(nextNoeud.etat,p.but)
+        while fils and path is None:
+            s = next(fils[-1], None)
+            if s is None:                       # plus de fils, on remonte
+                fils.pop()
+                etats.pop()
+                couts.pop()
+                chemin.discard(cles.pop())
+                continue
+            nb_iteration += 1
+            k = p.immatriculation(s)
+            if k in chemin:                     # cycle
+                continue
+            g = couts[-1] + p.cost(etats[-1],s)
+            f = g + p.h_value(s,p.but)
             if stepwise:
+                print (str(s) + "valeur=" + str(g))
                 print ("valeur f:", f)
                 print ("seuil:", seuil)
-            if f <= seuil:                     
-                front.pop()
-                front.append((m,k+1))           # en se souvenant du prochain fils de m a d
-                front.append((nextNoeud,1))     # on continue la recherche
-            else:
+            if f > seuil:
                 nextSeuil = min(nextSeuil,f)    # augmentation du seuil prochain
-                front.pop()                     # 
-                front.append((m,k+1))
-                if stepwise:
-                    #print("Augmentation du seuil:",nextSeuil)
-                    input("Press Enter to keep exploring")
-                
-                
+                continue
+            if table is not None:
+                if table.get(k,inf) <= g:
+                    continue
+                if k in table or len(table) < TABLE_SIZE:
+                    table[k] = g
+            etats.append(s)                     # on continue la recherche
+            couts.append(g)
+            fils.append(iter(p.successeurs(s)))
+            cles.append(k)
+            chemin.add(k)
+            frontier_peak = max(frontier_peak, len(etats))
+            if p.estBut(s):
+                path = etats
+        
+        nb_noeuds += nb_iteration
+        if path is None:
+            if nextSeuil == inf:                # but inaccessible
+                path = [p.init]
+                break
+            reopenings += nb_iteration
+            if stepwise:
+                print("Augmentation du seuil:",nextSeuil)
+                input("Press Enter to keep exploring")
+            seuil = nextSeuil
+            
     # Affichage de la solution
-    n = m
-    c=0    
-    while n!=None :
-        print (n)
-        n = n.pere
-        c+=1
-    print ("Nombre d'étapes de la solution:", c-1)  
-
+    if not quiet:
+        if p.estBut(path[-1]):
+            print ("Solution trouvée")
+        print_trace(path,p)
             
     # Mode verbose    
     # Affichage des statistiques de recherche
-    if verbose:
+    if verbose and not quiet:
         print ("=------------------------------=")
         print ("Nombre de noeuds étendus", nb_noeuds)
-        #c=0
-        #for n in front:
-        #    if p.immatriculation(n.etat) not in closed:
-        #        c+=1
-        print ("Nombre de noeuds en mémoire", len(front))
+        print ("Nombre de noeuds en mémoire", 
+               len(path) + (len(table) if table is not None else 0))
         print ("temps de calcul:", time.time() - startTime)
         print ("=------------------------------=")
 
-    
-    return
-    
-
-            
-
+    return SearchResult(path,
+                        nodes_expanded=nb_noeuds,
+                        frontier_peak=frontier_peak,
+                        reopenings=reopenings,
+                        time=time.time() - startTime)
@@ -0,0 +1,212 @@
+# -*- coding: utf-8 -*-
+"""
+Table des plus courts chemins entre toutes les cases libres d'une carte
+
+La table est une matrice uint16 (cases libres x cases libres) construite
+par un parcours en largeur depuis chaque case libre (algorithme de Dial, et
+uint32 si nécessaire, lorsque la carte a des coûts de terrain ; Dijkstra
+en 8-connexité, et float64 avec des pas diagonaux irrationnels). Elle est
+sauvegardée sur disque, indexée par une empreinte du fichier JSON de la
+carte, et rechargée en mémoire projetée (memory-mapped) : une distance est
+alors une simple lecture, sans appel à A*. Un fichier JSON voisin décrit la
+table (empreinte de la grille, type et dimensions) ; elle est recalculée
+s'il ne correspond pas à la grille demandée.
+"""
+
+import hashlib
+import json
+import math
+import os
+import tempfile
+import numpy as np
+
+from search.fields import (MOVE_COSTS, dial_field, distance_field, 
+                           grid_fingerprint, neighbour_table, octile_field)
+from settings import CACHE_DIR
+
+
+# valeur d'une table uint16 pour les couples de cases non reliés
+UNREACHABLE = np.iinfo(np.uint16).max
+
+
+def map_fingerprint(carte):
+    """ retourne une empreinte des données JSON d'une carte
+        """
+    data = json.dumps(carte, sort_keys=True).encode('utf-8')
+    return hashlib.sha1(data).hexdigest()
+
+
+def table_dtypes(connectivity=4,move_costs=MOVE_COSTS):
+    """ retourne les types possibles d'une table, dans l'ordre où ils
+        sont essayés : float64 si les pas diagonaux ne sont pas entiers,
+        sinon uint16 puis uint32 pour les grandes distances
+        """
+    if connectivity == 8 and not all(
+            isinstance(c, (int, np.integer)) for c in move_costs):
+        return (np.dtype(np.float64),)
+    return (np.dtype(np.uint16),np.dtype(np.uint32))
+
+
+def _replace(path,write):
+    """ écrit le fichier path via write(fichier) dans un fichier
+        temporaire du même répertoire, puis le renomme : une écriture
+        interrompue ne laisse jamais de fichier incomplet
+        """
+    fd, tmp_path = tempfile.mkstemp(suffix=os.path.splitext(path)[1],
+                                    dir=os.path.dirname(path) or '.')
+    try:
+        with os.fdopen(fd, 'wb') as tmp_file:
+            write(tmp_file)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+
+class ShortestPathTable:
+    """ distances exactes (en nombre de pas, ou en coût si une grille de
+        coûts est donnée) entre les cases libres d'une grille, donnée
+        comme un array booléen (False: obstacle), en 4- ou 8-connexité
+        (cf. search.fields pour move_costs et corner_cutting)
+        """
+
+    def __init__(self,grid,matrix=None,costs=None,
+                 connectivity=4,move_costs=MOVE_COSTS,corner_cutting=False):
+        self.grid = grid
+        self.costs = costs
+        self.connectivity = connectivity
+        self.move_costs = move_costs
+        self.corner_cutting = corner_cutting
+        (_,self.nb_cols) = grid.shape
+        # indices à plat des cases libres, et rang de chaque case dans la
+        # table (-1 pour les obstacles)
+        self.cells = np.flatnonzero(grid.ravel())
+        self.ranks = np.full(grid.size, -1, dtype=np.int64)
+        self.ranks[self.cells] = np.arange(len(self.cells))
+        if matrix is None:
+            matrix = self._build()
+        self.matrix = matrix
+        # valeur des couples non reliés
+        if np.issubdtype(matrix.dtype, np.floating):
+            self.unreachable = math.inf
+        else:
+            self.unreachable = np.iinfo(matrix.dtype).max
+
+    def _build(self):
+        """ un parcours en largeur (ou de Dial, ou de Dijkstra) par case
+            libre ; chaque ligne est écrite directement dans la table
+            """
+        neighbours = neighbour_table(self.grid)
+        nb_cells = len(self.cells)
+        dtype = table_dtypes(self.connectivity, self.move_costs)[0]
+        matrix = np.empty((nb_cells,nb_cells), dtype=dtype)
+        for k,c in enumerate(self.cells):
+            source = divmod(int(c), self.nb_cols)
+            if self.connectivity == 8:
+                field = octile_field(self.grid, source, self.move_costs,
+                                     self.costs, self.corner_cutting)
+            elif self.costs is None:
+                field = distance_field(self.grid, source, neighbours)
+            else:
+                field = dial_field(self.grid, self.costs, source)
+            row = field.ravel()[self.cells]
+            if matrix.dtype == np.float64:
+                row[row < 0] = math.inf
+            else:
+                if (matrix.dtype == np.uint16 and 
+                        row.max() >= np.iinfo(np.uint16).max):
+                    # distances trop grandes : passage en uint32, une fois,
+                    # en conservant les couples non reliés déjà écrits
+                    wide = matrix.astype(np.uint32)
+                    wide[:k][matrix[:k] == np.iinfo(np.uint16).max] = \
+                        np.iinfo(np.uint32).max
+                    matrix = wide
+                row[row < 0] = np.iinfo(matrix.dtype).max
+            matrix[k] = row
+        return matrix
+
+    def rank(self,etat):
+        """ retourne le rang de la case etat dans la table, -1 si ce
+            n'est pas une case libre
+            """
+        (x,y) = etat
+        return self.ranks[x * self.nb_cols + y]
+
+    def distance(self,p1,p2):
+        """ calcule la distance entre le tuple p1 et le tuple p2
+            """
+        (r1,r2) = (self.rank(p1),self.rank(p2))
+        if r1 < 0 or r2 < 0 or self.matrix[r1,r2] == self.unreachable:
+            return math.inf
+        return self.matrix[r1,r2].item()
+
+    def distances(self,players_positions,goals_positions):
+        """ retourne la matrice joueurs x cibles des distances,
+            (même signature que distances.manhattan)
+            les couples non reliés sont à l'infini
+            """
+        players_positions = np.asarray(players_positions).reshape(-1,2)
+        goals_positions = np.asarray(goals_positions).reshape(-1,2)
+        rows = self.ranks[players_positions[:,0] * self.nb_cols +
+                          players_positions[:,1]]
+        cols = self.ranks[goals_positions[:,0] * self.nb_cols +
+                          goals_positions[:,1]]
+        d = self.matrix[np.ix_(np.maximum(rows,0),np.maximum(cols,0))]
+        d = d.astype(self.matrix.dtype if self.unreachable == math.inf 
+                     else np.int64)
+        unreachable = ((d == self.unreachable) | (rows[:,None] < 0) |
+                       (cols[None,:] < 0))
+        if unreachable.any():
+            d = d.astype(float)
+            d[unreachable] = math.inf
+        return d
+
+
+def load_shortest_paths(grid,key,cache_dir=CACHE_DIR,costs=None,
+                        connectivity=4,move_costs=MOVE_COSTS,
+                        corner_cutting=False):
+    """ retourne la table de la grille, calculée une seule fois puis
+        sauvegardée dans cache_dir sous le nom donné par key (empreinte
+        de la carte, cf. map_fingerprint)
+        costs : grille des coûts de terrain (cf. search.terrain)
+        connectivity, move_costs, corner_cutting : modèle de déplacement
+        (cf. ShortestPathTable)
+        cache_dir=None pour ne pas utiliser de cache
+        """
+    movement = dict(connectivity=connectivity, move_costs=move_costs,
+                    corner_cutting=corner_cutting)
+    if cache_dir is None:
+        return ShortestPathTable(grid, costs=costs, **movement)
+    if costs is not None:
+        key += '_' + grid_fingerprint(grid, costs)[:12]
+    if connectivity == 8:
+        key += '_8_' + '_'.join(f'{c:g}' for c in move_costs)
+        if corner_cutting:
+            key += '_cc'
+    path = os.path.join(cache_dir, f'shortest_paths_{key}.npy')
+    meta_path = os.path.join(cache_dir, f'shortest_paths_{key}.json')
+    nb_cells = int(np.count_nonzero(grid))
+    fingerprint = grid_fingerprint(grid, costs)
+    dtypes = table_dtypes(connectivity, move_costs)
+    if os.path.exists(path) and os.path.exists(meta_path):
+        try:
+            with open(meta_path, 'r') as meta_file:
+                meta = json.load(meta_file)
+            matrix = np.load(path, mmap_mode='r')
+        except (OSError, ValueError):
+            meta, matrix = None, None
+        if (meta is not None and meta.get('grid') == fingerprint and
+                matrix.dtype in dtypes and 
+                meta.get('dtype') == matrix.dtype.str and
+                matrix.shape == (nb_cells,nb_cells)):
+            return ShortestPathTable(grid, matrix, costs, **movement)
+    table = ShortestPathTable(grid, costs=costs, **movement)
+    os.makedirs(cache_dir, exist_ok=True)
+    # la table d'abord, sa description ensuite : une description valide
+    # n'accompagne jamais une table incomplète
+    _replace(path, lambda f: np.save(f, table.matrix))
+    meta = {'grid': fingerprint, 'dtype': table.matrix.dtype.str,
+            'shape': [nb_cells,nb_cells]}
+    _replace(meta_path, lambda f: f.write(json.dumps(meta).encode('utf-8')))
+    return ShortestPathTable(grid, np.load(path, mmap_mode='r'), costs,
+                             **movement)
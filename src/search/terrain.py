@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+"""
+Coûts de déplacement lus dans une carte Tiled
+
+Un calque portant la propriété entière COST_PROPERTY (par exemple un calque
+"quartier_lent" avec cost = 3) donne ce coût à toutes les cases où il a une
+tuile. Les autres cases coûtent DEFAULT_COST. Le coût d'une case est le coût
+pour y entrer.
+"""
+
+import numpy as np
+
+
+# nom de la propriété de calque donnant le coût
+COST_PROPERTY = 'cost'
+
+# coût des cases sans terrain particulier
+DEFAULT_COST = 1
+
+
+def layer_properties(layer):
+    """ retourne les propriétés d'un calque Tiled dans un dictionnaire
+        (Tiled écrit une liste de {name, type, value}, les anciennes
+        versions un dictionnaire)
+        """
+    properties = layer.get('properties', {})
+    if isinstance(properties, list):
+        return {prop['name']: prop['value'] for prop in properties}
+    return dict(properties)
+
+
+def load_cost_grid(carte, property_name=COST_PROPERTY, default=DEFAULT_COST):
+    """ construit la grille des coûts d'une carte (données JSON Tiled)
+        les calques sont appliqués dans l'ordre, le dernier l'emporte
+        retourne un array d'entiers (lignes, colonnes), None si aucun
+        calque ne porte la propriété
+        """
+    (nb_rows,nb_cols) = (carte['height'],carte['width'])
+    costs = np.full((nb_rows,nb_cols), default, dtype=np.int64)
+    found = False
+    for layer in carte['layers']:
+        properties = layer_properties(layer)
+        if property_name not in properties or 'data' not in layer:
+            continue
+        cost = int(properties[property_name])
+        if cost <= 0:
+            raise ValueError(f"Coût de terrain non strictement positif "
+                             f"dans le calque {layer['name']} : {cost}")
+        data = np.array(layer['data']).reshape(nb_rows,nb_cols)
+        costs[data > 0] = cost
+        found = True
+    return costs if found else None
@@ -0,0 +1,12 @@
+# -*- coding: utf-8 -*-
+#
+# Intelligence Artificielle & Jeux
+# Sorbonne Université
+#
+# Ben Kabongo
+# Mars 2022
+#
+
+# répertoire des caches sur disque (équilibres, tables de plus courts
+# chemins)
+CACHE_DIR = './cache/'
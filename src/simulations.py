@@ -10,10 +10,11 @@
 from __future__ import (absolute_import, 
                         print_function, 
                         unicode_literals)
+import multiprocessing
 import numpy as np
 import random
 import matplotlib.pyplot as plt
-import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
 import pygame
 import pySpriteWorld.glo
 from pySpriteWorld.gameclass import Game,check_init_game_done
@@ -21,8 +22,10 @@ from pySpriteWorld.spritebuilder import SpriteBuilder
 from pySpriteWorld.players import Player
 from pySpriteWorld.sprite import MovingSprite
 from pySpriteWorld.ontology import Ontology
-from search.grid2D import ProblemeGrid2D
-from search import probleme
+from search.batch import BatchPlanner
+from search.cache import default_cache as path_cache
+from search.shortest_paths import load_shortest_paths, map_fingerprint
+from search.terrain import load_cost_grid
 
 import strategies
 
@@ -98,16 +101,52 @@ for row in range(nb_lines):
         if (row, col) not in wall_positions:
             legals_positions.append((row, col))
 
-def play(
+# table des plus courts chemins entre les cases libres de la carte
+grid = np.ones((nb_lines, nb_cols), dtype=bool)
+for w in wall_positions:
+    grid[w] = False
+# coûts de terrain (None si la carte n'en définit pas : coûts unitaires)
+terrain_costs = load_cost_grid(game.spriteBuilder.carte)
+# déplacements : 4 (orthogonaux) ou 8 (diagonales comprises)
+connectivity = 4
+path_planner = BatchPlanner(grid, terrain_costs, connectivity, 
+                            cache=path_cache)
+shortest_paths = load_shortest_paths(grid, 
+                                    map_fingerprint(game.spriteBuilder.carte),
+                                    costs=terrain_costs,
+                                    connectivity=connectivity)
+
+def simulate(
         nb_days=10, 
         dist_min=12,
         strat1=strategies.RandomStrategy,
         strat2=strategies.RandomStrategy,
         strat1_args={},
-        strat2_args={}
+        strat2_args={},
+        seed=None,
+        echo=None
         ):
-        
-    global _log_file
+    '''
+    joue une confrontation, sans rien écrire sur disque (peut être
+    exécutée dans un processus du tournoi)
+    :param seed (int)
+        graine des générateurs aléatoires, None pour ne pas les réinitialiser
+    :param echo (bool)
+        affichage du journal, _verbose par défaut
+    :return (dict)
+        noms des stratégies, lignes du journal et, par jour, scores et
+        coûts cumulés des deux stratégies
+    '''
+    if seed is not None:
+        random.seed(seed)
+        np.random.seed(seed % 2**32)
+    if echo is None:
+        echo = _verbose
+    lines = []
+    def log(text):
+        if echo:
+            print(text)
+        lines.append(text)
 
     # initialisation des strategies
     strat1_ = strat1(1, team1_ids, nb_goals, dist_min, **strat1_args)
@@ -115,12 +154,9 @@ def play(
     strat1_.set_adversary(strat2_)
     strat2_.set_adversary(strat1_)
 
-    _log_file_name = ('./log/' + f'{strat1_.name}_{strat2_.name}_'+
-        f'days_{nb_days}_dist_{("inf" if dist_min == np.inf else dist_min)}.txt')
-    _log_file.close()
-    _log_file = open(_log_file_name, 'w')
-
-    verbose(f'{strat1_.name} - {strat2_.name}')
+    log(f'{strat1_.name} - {strat2_.name}')
+    nb_fields = path_planner.nb_fields
+    cache_start = path_cache.info()
 
     players_current_positions = players_init_positions
     goals_current_positions = goals_init_positions
@@ -136,15 +172,19 @@ def play(
         for i in team2_ids:
             team2_positions[i] = players_current_positions[i]
         
-        strat1_.update_distances(team1_positions, goals_current_positions)
-        strat2_.update_distances(team2_positions, goals_current_positions)
+        strat1_.update_distances(team1_positions, 
+                                goals_current_positions, 
+                                shortest_paths.distances)
+        strat2_.update_distances(team2_positions, 
+                                goals_current_positions, 
+                                shortest_paths.distances)
 
         # génération des objectifs en fonction des stratégies
         goals_id_team1, distribution_team1 = strat1_.generate()
         goals_id_team2, distribution_team2 = strat2_.generate()
 
-        verbose(f'{strat1_.name} : {distribution_team1}')
-        verbose(f'{strat2_.name} : {distribution_team2}')
+        log(f'{strat1_.name} : {distribution_team1}')
+        log(f'{strat2_.name} : {distribution_team2}')
 
         goal_id_by_player = dict()
         goal_id_by_player.update(goals_id_team1)
@@ -163,76 +203,169 @@ def play(
         strat1_.save_day_results(votes)
         strat2_.save_day_results(votes)
 
-        # Calcul de A* pour chaque joueur
-        paths = {}
-        for i in goals.keys():
-            g = np.ones((nb_lines,nb_cols),dtype=bool)
-            for w in wall_positions:
-                g[w] = False
-            p = ProblemeGrid2D(players_init_positions[i], goals[i], g, 'manhattan')
-            _stdout = sys.__stdout__
-            sys.stdout = None
-            path = probleme.astar(p)
-            sys.stdout = _stdout
-            paths[i] = path
-            #verbose(f"Chemin trouvé pour le joueur {i} : {path}")
+        # chemins des joueurs : un champ de distances par cible, tous
+        # les chemins regroupés dans cells
+        players_ids = list(goals.keys())
+        lengths, offsets, cells = path_planner.paths(
+            [players_init_positions[i] for i in players_ids],
+            [goals[i] for i in players_ids])
                     
         # changement des positions des cibles
         goals_current_positions = random.sample(legals_positions, nb_goals)
-    
+
+    log(f"Champs de distances calculés \t: "+
+        f"{path_planner.nb_fields - nb_fields}")
+    cache_info = path_cache.info()
+    log(f"Cache des chemins \t: "+
+        f"{cache_info['hits'] - cache_start['hits']} succès, "+
+        f"{cache_info['misses'] - cache_start['misses']} échecs")
+
+    return {
+        'names': (strat1_.name, strat2_.name),
+        'nb_days': nb_days,
+        'dist_min': dist_min,
+        'log': lines,
+        'scores': (list(strat1_.cumulative_score_memory),
+                   list(strat2_.cumulative_score_memory)),
+        'coasts': (list(strat1_.cumulative_coast_memory),
+                   list(strat2_.cumulative_coast_memory)),
+    }
+
+
+def save_results(results):
+    '''
+    écrit le journal et les courbes d'une confrontation
+    :param results (dict)
+        résultats retournés par simulate
+    '''
+    name1, name2 = results['names']
+    nb_days = results['nb_days']
+    dist_min = results['dist_min']
+    suffix = (f'{name1}_{name2}_'+
+        f'days_{nb_days}_dist_{("inf" if dist_min == np.inf else dist_min)}')
+
+    with open('./log/' + suffix + '.txt', 'w') as log_file:
+        for text in results['log']:
+            log_file.write(text + '\n')
+
     days = np.arange(0, nb_days+1)
+    scores = [np.array(x) for x in results['scores']]
+    coasts = [np.array(x) for x in results['coasts']]
 
     plt.title(f"Scores")
     plt.plot(days, 
-            strat1_.cumulative_score_memory, 
-            label=strat1_.name)
+            scores[0], 
+            label=name1)
     plt.plot(days,
-            strat2_.cumulative_score_memory,
-            label=strat2_.name)
+            scores[1],
+            label=name2)
     plt.xlabel("Jours")
     plt.ylabel("Scores")
     plt.legend()
-    plt.savefig(
-        f'./out/scores/{strat1_.name}_{strat2_.name}_'+
-        f'days_{nb_days}_dist_{("inf" if dist_min == np.inf else dist_min)}.png'
-    )
+    plt.savefig(f'./out/scores/{suffix}.png')
     plt.clf()
 
     plt.title(f"Coûts des trajets")
     plt.plot(days,
-            strat1_.cumulative_coast_memory, 
-            label=strat1_.name)
+            coasts[0], 
+            label=name1)
     plt.plot(days,
-            strat2_.cumulative_coast_memory, 
-            label=strat2_.name)
+            coasts[1], 
+            label=name2)
     plt.xlabel("Jours")
     plt.ylabel("Coûts")
     plt.legend() 
-    plt.savefig(
-        f'./out/coasts/{strat1_.name}_{strat2_.name}_'+
-        f'days_{nb_days}_dist_{("inf" if dist_min == np.inf else dist_min)}.png'
-    )
+    plt.savefig(f'./out/coasts/{suffix}.png')
     plt.clf()
 
     plt.title(f"Rapport Score/Coût")
     plt.plot(days,
-            (np.array(strat1_.cumulative_score_memory) / 
-            np.array(strat1_.cumulative_coast_memory)), 
-            label=strat1_.name)
+            scores[0] / coasts[0], 
+            label=name1)
     plt.plot(days,
-            (np.array(strat2_.cumulative_score_memory) / 
-            np.array(strat2_.cumulative_coast_memory)), 
-            label=strat2_.name)
+            scores[1] / coasts[1], 
+            label=name2)
     plt.xlabel("Jours")
     plt.ylabel("Coûts")
     plt.legend() 
-    plt.savefig(
-        f'./out/scores_coasts/{strat1_.name}_{strat2_.name}_'+
-        f'days_{nb_days}_dist_{("inf" if dist_min == np.inf else dist_min)}.png'
-    )
+    plt.savefig(f'./out/scores_coasts/{suffix}.png')
     plt.clf()
 
 
+def play(
+        nb_days=10, 
+        dist_min=12,
+        strat1=strategies.RandomStrategy,
+        strat2=strategies.RandomStrategy,
+        strat1_args={},
+        strat2_args={}
+        ):
+    '''
+    joue une confrontation et sauvegarde ses résultats
+    '''
+    results = simulate(nb_days, dist_min, strat1, strat2, 
+                       strat1_args, strat2_args)
+    save_results(results)
+    return results
+
+
+def tournament(
+        strats, 
+        nb_days=100, 
+        dist_min=np.inf, 
+        max_workers=None, 
+        seed=None
+        ):
+    '''
+    joue toutes les confrontations entre stratégies (aller et retour),
+    réparties sur un pool de processus ; les résultats sont sauvegardés
+    par le processus principal, au fur et à mesure qu'ils arrivent
+    Sans fork, les confrontations sont jouées l'une après l'autre dans le
+    processus principal.
+    :param strats (dict)
+        arguments de chaque classe de stratégie
+    :param max_workers (int)
+        nombre de processus, le nombre de cœurs par défaut
+    :param seed (int)
+        graine du tournoi : chaque confrontation reçoit sa propre graine
+    :return (dict)
+        résultats de simulate par couple de noms de stratégies
+    '''
+    rng = random.Random(seed)
+    matchups = [
+        (nb_days, dist_min, strat1, strat2, args1, args2, 
+         rng.randrange(2**32), False)
+        for strat1, args1 in strats.items()
+        for strat2, args2 in strats.items()
+    ]
+    all_results = {}
+
+    def collect(results):
+        save_results(results)
+        all_results[results['names']] = results
+        verbose(f"{results['names'][0]} - {results['names'][1]} \t: "+
+                f"{results['scores'][0][-1]} / {results['scores'][1][-1]}")
+
+    # les processus fils doivent hériter de l'état du module (carte, table
+    # des distances) : avec spawn, ils réimporteraient ce module, qui
+    # écrase log.txt et relance le jeu
+    try:
+        context = multiprocessing.get_context('fork')
+    except ValueError:
+        for matchup in matchups:
+            collect(simulate(*matchup))
+        return all_results
+
+    _log_file.flush()
+    with ProcessPoolExecutor(max_workers=max_workers, 
+                             mp_context=context) as executor:
+        futures = [executor.submit(simulate, *matchup) 
+                   for matchup in matchups]
+        for future in as_completed(futures):
+            collect(future.result())
+    return all_results
+
+
 if __name__ == '__main__':
     strats = {
         strategies.RandomStrategy: {},
@@ -251,13 +384,4 @@ if __name__ == '__main__':
         strategies.ExpertStochasticStrategy: {}
     }
 
-    for strat1, args1 in strats.items():
-        for strat2, args2 in strats.items():
-            play(
-                100, 
-                np.inf, 
-                strat1,
-                strat2,
-                args1,
-                args2
-            )
+    tournament(strats, 100, np.inf)
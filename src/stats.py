@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+#
+# Intelligence Artificielle & Jeux
+# Sorbonne Université
+#
+# Ben Kabongo
+# Mars 2022
+#
+
+import numpy as np
+
+
+class StrategyStats:
+    '''
+    Statistiques des distributions jouées
+
+    Chaque distribution est internée sous un identifiant entier (dans
+    l'ordre de première apparition). Les distributions, les compteurs et les
+    sommes des scores sont stockés dans des tableaux NumPy qui grandissent
+    par doublement, et la distribution de meilleur score moyen est
+    maintenue dans un tas indexé : une mise à jour coûte O(log S) au lieu
+    de parcourir les S distributions observées.
+    '''
+
+    def __init__(self, capacity=64):
+        '''
+        :param capacity (int)
+            nombre initial de distributions réservées
+        '''
+        self.ids = {}           # distribution -> identifiant
+        self.distribs = []      # identifiant -> distribution
+        self.distrib_array = None   # mêmes distributions, une par ligne
+        self.counts = np.zeros(capacity, dtype=np.int64)
+        self.sums = np.zeros(capacity)
+        self.means = np.zeros(capacity)
+        self.heap = []          # identifiants, tas max sur les moyennes
+        self.heap_pos = np.zeros(capacity, dtype=np.int64)
+
+    def __len__(self):
+        return len(self.distribs)
+
+    def __contains__(self, r):
+        return tuple(r) in self.ids
+
+    def intern(self, r):
+        '''
+        :param r (tuple)
+            distribution
+        :return (int)
+            identifiant de r, créé si r n'a jamais été vue
+        '''
+        r = tuple(r)
+        i = self.ids.get(r)
+        if i is not None:
+            return i
+        i = len(self.distribs)
+        if i == len(self.counts):
+            self._grow()
+        self.ids[r] = i
+        self.distribs.append(r)
+        if self.distrib_array is None:
+            self.distrib_array = np.zeros((len(self.counts), len(r)), 
+                                          dtype=np.int64)
+        self.distrib_array[i] = r
+        self.heap_pos[i] = len(self.heap)
+        self.heap.append(i)
+        self._sift_up(self.heap_pos[i])
+        return i
+
+    def add(self, r, score=0, count=1):
+        '''
+        enregistre count parties de la distribution r pour un score total
+        score
+        :return (int)
+            identifiant de r
+        '''
+        i = self.intern(r)
+        self.counts[i] += count
+        self.sums[i] += score
+        old = self.means[i]
+        self.means[i] = self.sums[i] / self.counts[i]
+        if self.means[i] > old:
+            self._sift_up(self.heap_pos[i])
+        elif self.means[i] < old:
+            self._sift_down(self.heap_pos[i])
+        return i
+
+    def best(self):
+        '''
+        :return (tuple, float)
+            la distribution de meilleur score moyen (la première observée
+            en cas d'égalité) et ce score, (None, 0) si aucune distribution
+            n'a été observée
+        '''
+        if len(self.heap) == 0:
+            return None, 0
+        i = self.heap[0]
+        return self.distribs[i], self.means[i]
+
+    def get_counts(self):
+        '''
+        :return (np.array)
+            compteurs des distributions, par identifiant
+        '''
+        return self.counts[:len(self)]
+
+    def get_distribs(self):
+        '''
+        :return (np.array)
+            tableau 2D des distributions, par identifiant (vue sur le
+            tableau interne, à ne pas modifier)
+        '''
+        if self.distrib_array is None:
+            return np.zeros((0, 0), dtype=np.int64)
+        return self.distrib_array[:len(self)]
+
+    def _grow(self):
+        n = 2 * len(self.counts)
+        for name in ('counts', 'sums', 'means', 'heap_pos'):
+            old = getattr(self, name)
+            new = np.zeros(n, dtype=old.dtype)
+            new[:len(old)] = old
+            setattr(self, name, new)
+        if self.distrib_array is not None:
+            new = np.zeros((n, self.distrib_array.shape[1]), dtype=np.int64)
+            new[:len(self.distrib_array)] = self.distrib_array
+            self.distrib_array = new
+
+    def _before(self, i, j):
+        '''
+        vrai si l'identifiant i doit être au-dessus de j dans le tas
+        '''
+        return (self.means[i] > self.means[j] or
+                (self.means[i] == self.means[j] and i < j))
+
+    def _swap(self, a, b):
+        heap = self.heap
+        heap[a], heap[b] = heap[b], heap[a]
+        self.heap_pos[heap[a]] = a
+        self.heap_pos[heap[b]] = b
+
+    def _sift_up(self, a):
+        while a > 0:
+            parent = (a - 1) // 2
+            if not self._before(self.heap[a], self.heap[parent]):
+                break
+            self._swap(a, parent)
+            a = parent
+
+    def _sift_down(self, a):
+        n = len(self.heap)
+        while True:
+            best = a
+            for child in (2 * a + 1, 2 * a + 2):
+                if child < n and self._before(self.heap[child], self.heap[best]):
+                    best = child
+            if best == a:
+                break
+            self._swap(a, best)
+            a = best
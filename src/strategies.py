@@ -11,6 +11,17 @@ import math
 import numpy as np
 import random
 
+from compositions import Compositions, count as count_distrib
+from distances import compute_distances, manhattan, unknown_distances
+from equilibrium import double_oracle, get_equilibrium
+from payoffs import get_payoff_matrix
+from responses import (best_response, 
+                    greedy_best_answer, 
+                    greedy_better_answer)
+from settings import CACHE_DIR
+from stats import StrategyStats
+from symmetry import Partitions, count as count_partitions, lift
+
 
 def compare(r1, r2):
     '''
@@ -38,13 +49,22 @@ def generate_distrib(limit, size):
     :param size (int)
         taille de la distribution
     '''
-    if size == 1:
-        return [[i] for i in range(limit+1)]
-    distribs = []
-    for i in range(limit+1):
-        for distrib in generate_distrib(limit-i, size-1):
-            distribs.append( [i] + distrib )
-    return distribs
+    return [list(r) for r in Compositions(limit, size)]
+
+
+# taille maximale de l'espace des distributions pour laquelle la matrice
+# des gains est construite ; au-delà, les distributions sont énumérées 
+# à la demande
+PAYOFF_MATRIX_MAX_SIZE = 4096
+
+
+def has_payoff_matrix(limit, size):
+    '''
+    :return (bool)
+        vrai si l'espace des distributions est assez petit pour que la
+        matrice des gains soit construite
+    '''
+    return count_distrib(limit, size) <= PAYOFF_MATRIX_MAX_SIZE
 
 
 def better_answer(r, limit):
@@ -56,10 +76,7 @@ def better_answer(r, limit):
     :return (list)
         une stratégie de répartition bien meilleure que r
     '''
-    for answer in generate_distrib(limit, len(r)):
-        w, _ = compare(answer, r)
-        if w == 1:
-            return tuple(answer)
+    return greedy_better_answer(r, limit)
 
 
 def all_better_answers(r, limit):
@@ -71,12 +88,17 @@ def all_better_answers(r, limit):
     :return (dict)
         la liste de toutes les stratégies meilleures que r et leur score
     '''
-    answers = {}
-    for answer in generate_distrib(limit, len(r)):
-        w, s = compare(answer, r)
-        if w == 1:
-            answers[tuple(answer)] = s
-    return answers
+    if not has_payoff_matrix(limit, len(r)):
+        answers = {}
+        for answer in Compositions(limit, len(r)):
+            w, s = compare(answer, r)
+            if w == 1:
+                answers[answer] = s
+        return answers
+    payoffs = get_payoff_matrix(limit, len(r))
+    wins = payoffs.wins_against(r)
+    better = np.flatnonzero(payoffs.winners_against(r) == 1)
+    return {payoffs.distrib(i): int(wins[i]) for i in better}
 
 
 def best_answer(r, limit):
@@ -88,13 +110,7 @@ def best_answer(r, limit):
     :return (list)
         la meilleure des stratégies de répartition bien meilleures que r
     '''
-    best = None
-    s = 0
-    for answer, score in all_better_answers(r, limit).items():
-        if score > s:
-            best = answer
-            s = score
-    return best
+    return greedy_best_answer(r, limit)
     
 
 class Strategy:
@@ -139,32 +155,25 @@ class Strategy:
         self.cumulative_score_memory = [0] # score cumulé
         self.cumulative_coast_memory = [0] # coût cumulé
 
-        # dictionnaire des stratégies jouées
-        self.strat_cum_scores  = {} # somme cumulée
-        self.strat_mean_scores = {} # scores moyens
-        self.strat_counts      = {} # compteurs
+        # statistiques des stratégies jouées (compteurs, scores cumulés
+        # et scores moyens)
+        self.strat_stats = StrategyStats()
         
         # meilleure stratégie courante
         self.current_best = []
 
         # distances 
         self.dist_min = dist_min
-        self.distances = {
-            player_id: [-math.inf for _ in range(self.nb_goals)] 
-            for player_id in self.players_ids
-        }
-        self.accessibles = {
-            player_id: list(range(self.nb_goals))
-            for player_id in self.players_ids
-        }
+        Strategy.set_distance_oracle(
+            self,
+            unknown_distances(self.players_ids, self.nb_goals)
+        )
 
     def _compute_travel_coast(self, v):
         '''
         Calcule le coût de déplacement journalier
         '''
-        coast = 0
-        for j, i in v.items():
-            coast += self.distances[j][i]
+        coast = self.distance_oracle.travel_coast(v)
         self.travel_coast_memory.append(coast)
         a = self.cumulative_coast_memory[-1]
         self.cumulative_coast_memory.append(a + coast)
@@ -174,13 +183,7 @@ class Strategy:
         met à jour les cibles accessibles par joueur en fonction de la 
         distance minimale autorisée
         '''
-        self.accessibles = {}
-        for j in self.players_ids:
-            accessibles = []
-            for i in range(self.nb_goals):
-                if self.distances[j][i] <= self.dist_min:
-                    accessibles.append(i)
-            self.accessibles[j] = accessibles
+        self.accessibles = self.distance_oracle.get_accessibles(self.dist_min)
         
     def _generate(self, v):
         '''
@@ -251,14 +254,7 @@ class Strategy:
         renvoie la liste des joueurs accessibles par cibles
         :return (dict)
         '''
-        g = {}
-        for i in range(self.nb_goals):
-            accessibles = []
-            for j in self.players_ids:
-                if i in self.accessibles[j]:
-                    accessibles.append(j)
-            g[i] = accessibles
-        return g
+        return self.distance_oracle.get_accessibles_players(self.dist_min)
 
     def save_day_results(self, votes):
         '''
@@ -278,25 +274,34 @@ class Strategy:
         '''
         self.adversary_strategy = adversary_strategy
 
-    def update_distances(self, team_positions_dict, goals_positions_list):
+    def set_distance_oracle(self, distance_oracle):
+        '''
+        :param distance_oracle (DistanceOracle)
+            distances du jour entre les joueurs de la team et les cibles,
+            partagées par référence
+        '''
+        self.distance_oracle = distance_oracle
+        self.distances = distance_oracle.distances
+        self._filter_accessibles()
+
+    def update_distances(self, 
+                        team_positions_dict, 
+                        goals_positions_list, 
+                        metric=manhattan):
         '''
         mis à jour des distances entre les joueurs et les cibles
         :param team_positions_dict (dict)
             dictionnaire des positions des joueurs de la team
         :param goals_positions_list (list)
             liste des positions des cibles
+        :param metric (function)
+            calcul de la matrice des distances, par exemple 
+            ShortestPathTable.distances pour les distances exactes sur la 
+            carte (cf. search.shortest_paths)
         '''
-        def manathan(p1, p2):
-            x1, y1 = p1
-            x2, y2 = p2
-            return abs(x2-x1) + abs(y2-y1)
-    
-        for j in self.players_ids:
-            p1 = team_positions_dict[j]
-            for i in range(self.nb_goals):
-                p2 = goals_positions_list[i]
-                self.distances[j][i] = manathan(p1, p2)
-        self._filter_accessibles()
+        self.set_distance_oracle(
+            compute_distances(team_positions_dict, goals_positions_list, metric)
+        )
 
 
 class RandomStrategy(Strategy):
@@ -487,7 +492,7 @@ class EpsilonStrategy(Strategy):
         self.eps = eps
 
     def generate(self):
-        if len(self.strat_counts) == 0 or random.random() < self.eps: # random
+        if len(self.strat_stats) == 0 or random.random() < self.eps: # random
             v = {}
             for j in self.players_ids:
                 if len(self.accessibles[j]) > 0:
@@ -503,21 +508,10 @@ class EpsilonStrategy(Strategy):
         
         r = self.distrib_memory[-1]
         s = self.score_memory[-1]
-        if r not in self.strat_counts:
-            self.strat_cum_scores[r] = 0
-            self.strat_counts[r] = 0
-        self.strat_cum_scores[r] += s
-        self.strat_counts[r] += 1
+        self.strat_stats.add(r, s)
         
-        r_max = []
-        max_mean = 0
-        for r in self.strat_counts:
-            mean = self.strat_cum_scores[r] / self.strat_counts[r]
-            if mean > max_mean:
-                max_mean = mean
-                r_max = r
-            self.strat_mean_scores[r] = mean
-        self.current_best = list(r_max)
+        r_max, max_mean = self.strat_stats.best()
+        self.current_best = list(r_max) if max_mean > 0 else []
 
 
 class AdversaryImitatorStrategy(Strategy):
@@ -577,7 +571,7 @@ class EpsilonImitatorStrategy(Strategy):
         self.eps = eps
 
     def generate(self):
-        if len(self.strat_counts) > 0 and random.random() > self.eps: # best
+        if len(self.strat_stats) > 0 and random.random() > self.eps: # best
             if self.current_best == []:
                 self.current_best = self._generate_random_distribution()
             v = self.from_distribution(self.current_best)
@@ -597,21 +591,10 @@ class EpsilonImitatorStrategy(Strategy):
         
         r = self.adversary_strategy.distrib_memory[-i]
         s = self.adversary_strategy.score_memory[-i]
-        if r not in self.strat_counts:
-            self.strat_cum_scores[r] = 0
-            self.strat_counts[r] = 0
-        self.strat_cum_scores[r] += s
-        self.strat_counts[r] += 1
+        self.strat_stats.add(r, s)
         
-        r_max = []
-        max_mean = 0
-        for r in self.strat_counts:
-            mean = self.strat_cum_scores[r] / self.strat_counts[r]
-            if mean > max_mean:
-                max_mean = mean
-                r_max = r
-            self.strat_mean_scores[r] = mean
-        self.current_best = list(r_max)
+        r_max, max_mean = self.strat_stats.best()
+        self.current_best = list(r_max) if max_mean > 0 else []
 
 
 class EpsilonImitatorMixStrategy(Strategy):
@@ -642,7 +625,7 @@ class EpsilonImitatorMixStrategy(Strategy):
         self.eps = eps
 
     def generate(self):
-        if len(self.strat_counts) == 0 or random.random() < self.eps: # random
+        if len(self.strat_stats) == 0 or random.random() < self.eps: # random
             v = {}
             for j in self.players_ids:
                 if len(self.accessibles[j]) > 0:
@@ -658,31 +641,16 @@ class EpsilonImitatorMixStrategy(Strategy):
         
         r = self.distrib_memory[-1]
         s = self.score_memory[-1]
-        if r not in self.strat_counts:
-            self.strat_cum_scores[r] = 0
-            self.strat_counts[r] = 0
-        self.strat_cum_scores[r] += s
-        self.strat_counts[r] += 1
+        self.strat_stats.add(r, s)
         
         i = self.team_id
         if len(self.adversary_strategy.score_memory) >= i:
             r = self.adversary_strategy.distrib_memory[-i]
             s = self.adversary_strategy.score_memory[-i]
-            if r not in self.strat_counts:
-                self.strat_cum_scores[r] = 0
-                self.strat_counts[r] = 0
-            self.strat_cum_scores[r] += s
-            self.strat_counts[r] += 1
-
-        r_max = []
-        max_mean = 0
-        for r in self.strat_counts:
-            mean = self.strat_cum_scores[r] / self.strat_counts[r]
-            if mean > max_mean:
-                max_mean = mean
-                r_max = r
-            self.strat_mean_scores[r] = mean
-        self.current_best = list(r_max)
+            self.strat_stats.add(r, s)
+
+        r_max, max_mean = self.strat_stats.best()
+        self.current_best = list(r_max) if max_mean > 0 else []
 
 
 class BetterAnswerLastAdversaryStrategy(Strategy):
@@ -784,21 +752,10 @@ class BestAnswerAdversaryStrategy(Strategy):
         if len(self.adversary_strategy.score_memory) >= i:
             r = self.adversary_strategy.distrib_memory[-i]
             s = self.adversary_strategy.score_memory[-i]
-            if r not in self.strat_counts:
-                self.strat_cum_scores[r] = 0
-                self.strat_counts[r] = 0
-            self.strat_cum_scores[r] += s
-            self.strat_counts[r] += 1
-
-        r_max = []
-        max_mean = 0
-        for r in self.strat_counts:
-            mean = self.strat_cum_scores[r] / self.strat_counts[r]
-            if mean > max_mean:
-                max_mean = mean
-                r_max = r
-            self.strat_mean_scores[r] = mean
-        self.current_best = list(r_max)
+            self.strat_stats.add(r, s)
+
+        r_max, max_mean = self.strat_stats.best()
+        self.current_best = list(r_max) if max_mean > 0 else []
 
 
 class FicticiousPlayStrategy(Strategy):
@@ -819,24 +776,17 @@ class FicticiousPlayStrategy(Strategy):
                         nb_goals, 
                         dist_min)
 
-        self.strategy_set = generate_distrib(self.nb_team_players, self.nb_goals)
-        self.adversary_strategy_counts = {}
-        self.adversary_strategy_probas = {}
+        self.adversary_strategy_stats = StrategyStats()
 
     def generate(self):
-        if len(self.adversary_strategy_counts) == 0:
+        if len(self.adversary_strategy_stats) == 0:
             r = self._generate_random_distribution()
             return self._generate(self.from_distribution(r))
-        best = []
-        score_max = -1
-        for r in self.strategy_set:
-            score = 0
-            for ra, p in self.adversary_strategy_probas.items():
-                s = np.sum(np.array(r) > np.array(ra))
-                score += s * p
-            if score > score_max:
-                score_max = score
-                best = r
+        best, _ = best_response(
+            self.adversary_strategy_stats.get_distribs(),
+            self.adversary_strategy_stats.get_counts(),
+            self.nb_team_players
+        )
         return self._generate(self.from_distribution(best))
 
     def save_day_results(self, votes):
@@ -845,13 +795,287 @@ class FicticiousPlayStrategy(Strategy):
         i = self.team_id
         if len(self.adversary_strategy.distrib_memory) >= i:
             r = self.adversary_strategy.distrib_memory[-i]
-            if r not in self.adversary_strategy_counts:
-                self.adversary_strategy_counts[r] = 0
-            self.adversary_strategy_counts[r] += 1
+            self.adversary_strategy_stats.add(r)
+
+
+class EquilibriumStrategy(Strategy):
+    '''
+    Stratégie d'équilibre
+
+    Joue chaque jour une distribution tirée selon l'équilibre de Nash mixte
+    symétrique du jeu, calculé une seule fois par taille de jeu et conservé
+    dans un cache sur disque
+    '''
+
+    def __init__(self, 
+                team_id, 
+                players_ids, 
+                nb_goals, 
+                dist_min=math.inf,
+                cache_dir=CACHE_DIR):
+        '''
+        :param cache_dir (str)
+            répertoire du cache des équilibres
+        '''
+        Strategy.__init__(self,
+                        'equilibrium', 
+                        team_id, 
+                        players_ids, 
+                        nb_goals, 
+                        dist_min)
+
+        # sans contrainte d'accessibilité les cibles sont interchangeables :
+        # l'équilibre est calculé sur les formes canoniques
+        self.symmetric = self.dist_min == math.inf
+        if self.symmetric:
+            size = count_partitions(self.nb_team_players, self.nb_goals)
+        else:
+            size = count_distrib(self.nb_team_players, self.nb_goals)
+        if size > PAYOFF_MATRIX_MAX_SIZE:
+            raise ValueError(
+                f'espace des distributions trop grand pour '
+                f'{self.nb_team_players} joueurs et {self.nb_goals} cibles, '
+                f'utiliser DoubleOracleStrategy'
+            )
+        self.distribs, self.probas = get_equilibrium(
+            self.nb_team_players, 
+            self.nb_goals, 
+            cache_dir,
+            symmetric=self.symmetric
+        )
+
+    def generate(self):
+        i = np.random.choice(len(self.probas), p=self.probas)
+        r = self.distribs[i]
+        r = lift(r) if self.symmetric else list(r)
+        return self._generate(self.from_distribution(r))
+
+
+class DoubleOracleStrategy(Strategy):
+    '''
+    Stratégie d'équilibre par double oracle
+
+    Comme la stratégie d'équilibre, mais l'équilibre est approché par double
+    oracle : l'espace des distributions n'est jamais énuméré, ce qui permet
+    de jouer sur des cartes avec beaucoup de militants et de cibles
+    '''
+
+    def __init__(self, 
+                team_id, 
+                players_ids, 
+                nb_goals, 
+                dist_min=math.inf,
+                tol=0.05,
+                max_iter=200,
+                time_budget=60.):
+        '''
+        :param tol (float)
+            écart de dualité visé
+        :param max_iter (int)
+            nombre maximum d'itérations du double oracle
+        :param time_budget (float)
+            temps de calcul maximum du double oracle, en secondes
+        '''
+        Strategy.__init__(self,
+                        'double_oracle', 
+                        team_id, 
+                        players_ids, 
+                        nb_goals, 
+                        dist_min)
+
+        self.distribs, self.probas, self.stats = double_oracle(
+            self.nb_team_players,
+            self.nb_goals,
+            tol,
+            max_iter,
+            time_budget
+        )
+
+    def generate(self):
+        i = np.random.choice(len(self.probas), p=self.probas)
+        r = list(self.distribs[i])
+        return self._generate(self.from_distribution(r))
+
+
+class _NoRegretStrategy(Strategy):
+    '''
+    Base des stratégies sans regret sur l'espace des distributions
+
+    Les gains cumulés de chaque distribution contre les coups adverses sont
+    conservés dans un vecteur NumPy. Si la matrice des gains est construite,
+    la mise à jour du jour est la lecture d'une colonne de cette matrice ;
+    sinon elle est paresseuse : seuls les effectifs adverses par cible sont
+    comptés, et le vecteur des gains n'est reconstruit qu'au moment de jouer.
+
+    Sans contrainte d'accessibilité, l'apprentissage porte sur les formes
+    canoniques des distributions (cf. symmetry), jouées avec une permutation
+    aléatoire des cibles.
+    '''
+
+    def __init__(self,
+                name,
+                team_id,
+                players_ids,
+                nb_goals,
+                dist_min=math.inf):
+        Strategy.__init__(self,
+                        name,
+                        team_id,
+                        players_ids,
+                        nb_goals,
+                        dist_min)
+
+        limit, size = self.nb_team_players, self.nb_goals
+        self.symmetric = self.dist_min == math.inf
+        if self.symmetric:
+            self.payoffs = None
+            self.strategy_set = np.array(list(Partitions(limit, size)),
+                                        dtype=np.int32)
+        elif has_payoff_matrix(limit, size):
+            self.payoffs = get_payoff_matrix(limit, size)
+            self.strategy_set = self.payoffs.distribs
+        else:
+            self.payoffs = None
+            self.strategy_set = np.array(list(Compositions(limit, size)),
+                                        dtype=np.int32)
+        self.cum_payoffs = np.zeros(len(self.strategy_set))
+        self.sum_strategies = np.zeros(len(self.strategy_set))
+
+        # mises à jour paresseuses : histogramme des effectifs adverses par
+        # cible, toutes cibles confondues pour les formes canoniques (les
+        # effectifs supérieurs à limit sont regroupés)
+        self.adversary_hist = np.zeros((1 if self.symmetric else size, 
+                                        limit + 2))
+        self.pending = False
+
+    def _strategy(self):
+        '''
+        :return (np.array)
+            stratégie mixte du jour sur strategy_set
+        '''
+        raise NotImplementedError
+
+    def _cum_payoffs(self):
+        '''
+        :return (np.array)
+            gains cumulés de chaque distribution contre les coups adverses
+        '''
+        if self.pending:
+            # below[i, x] : nombre de jours où l'adversaire a placé moins
+            # de x joueurs sur la cible i
+            below = np.cumsum(self.adversary_hist, axis=1)
+            below = np.hstack([np.zeros((len(below), 1)), below])
+            if self.symmetric:
+                # chaque terme d'une forme canonique affronte en moyenne
+                # chacune des cibles adverses
+                self.cum_payoffs = (below[0, self.strategy_set].sum(axis=1) / 
+                                    self.nb_goals)
+            else:
+                goals = np.arange(self.nb_goals)
+                self.cum_payoffs = below[goals, self.strategy_set].sum(axis=1)
+            self.pending = False
+        return self.cum_payoffs
+
+    def average_strategy(self):
+        '''
+        :return (np.array, np.array)
+            les distributions (formes canoniques si les cibles sont 
+            interchangeables) jouées en moyenne et leurs probabilités
+        '''
+        total = self.sum_strategies.sum()
+        if total == 0:
+            return self.strategy_set[:0], np.zeros(0)
+        support = np.flatnonzero(self.sum_strategies > 0)
+        return (self.strategy_set[support], 
+                self.sum_strategies[support] / total)
+
+    def generate(self):
+        sigma = self._strategy()
+        self.sum_strategies += sigma
+        i = np.random.choice(len(sigma), p=sigma)
+        r = self.strategy_set[i]
+        r = lift(r) if self.symmetric else list(r)
+        return self._generate(self.from_distribution(r))
+
+    def save_day_results(self, votes):
+        super().save_day_results(votes)
+
+        # les deux équipes ont déjà joué : la dernière distribution adverse
+        # est celle du jour
+        if len(self.adversary_strategy.distrib_memory) == 0:
+            return
+        r = self.adversary_strategy.distrib_memory[-1]
+        if self.payoffs is not None:
+            self.cum_payoffs += self.payoffs.wins_against(r)
+            return
+        r = np.minimum(r, self.nb_team_players + 1)
+        if self.symmetric:
+            np.add.at(self.adversary_hist[0], r, 1)
+        else:
+            self.adversary_hist[np.arange(self.nb_goals), r] += 1
+        self.pending = True
+
+
+class RegretMatchingStrategy(_NoRegretStrategy):
+    '''
+    Stratégie du regret matching
+
+    Chaque distribution est jouée avec une probabilité proportionnelle à
+    son regret positif cumulé ; la stratégie moyenne converge vers un
+    équilibre
+    '''
+
+    def __init__(self,
+                team_id,
+                players_ids,
+                nb_goals,
+                dist_min=math.inf):
+        _NoRegretStrategy.__init__(self,
+                                'regret_matching',
+                                team_id,
+                                players_ids,
+                                nb_goals,
+                                dist_min)
+
+    def _strategy(self):
+        regrets = self._cum_payoffs() - self.cumulative_score_memory[-1]
+        regrets = np.maximum(regrets, 0)
+        s = regrets.sum()
+        if s == 0:
+            return np.ones(len(regrets)) / len(regrets)
+        return regrets / s
+
+
+class HedgeStrategy(_NoRegretStrategy):
+    '''
+    Stratégie Hedge (poids exponentiels)
+
+    Chaque distribution est jouée avec une probabilité proportionnelle à
+    exp(eta x gain cumulé)
+    '''
+
+    def __init__(self,
+                team_id,
+                players_ids,
+                nb_goals,
+                dist_min=math.inf,
+                eta=0.1):
+        '''
+        :param eta (float)
+            taux d'apprentissage
+        '''
+        _NoRegretStrategy.__init__(self,
+                                f'hedge_{eta}',
+                                team_id,
+                                players_ids,
+                                nb_goals,
+                                dist_min)
+        self.eta = eta
 
-        n = len(self.distrib_memory)
-        for r in self.adversary_strategy_counts:
-            self.adversary_strategy_probas[r] = self.adversary_strategy_counts[r] / n
+    def _strategy(self):
+        u = self.eta * self._cum_payoffs()
+        w = np.exp(u - np.max(u))
+        return w / w.sum()
 
 
 class ExpertStochasticStrategy(Strategy):
@@ -898,7 +1122,7 @@ class ExpertStochasticStrategy(Strategy):
         for strat in self.strategies:
             strat.set_adversary(adversary_strategy)
 
-    def update_distances(self, team_positions_dict, goals_positions_list):
-        super().update_distances(team_positions_dict, goals_positions_list)
+    def set_distance_oracle(self, distance_oracle):
+        super().set_distance_oracle(distance_oracle)
         for strat in self.strategies:
-            strat.update_distances(team_positions_dict, goals_positions_list)
+            strat.set_distance_oracle(distance_oracle)
@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+#
+# Intelligence Artificielle & Jeux
+# Sorbonne Université
+#
+# Ben Kabongo
+# Mars 2022
+#
+
+import numpy as np
+
+
+class Partitions:
+    '''
+    Formes canoniques des distributions de taille size dont la somme est
+    bornée à limit : distributions triées par ordre décroissant
+
+    Lorsque toutes les cibles sont accessibles à tous les joueurs, les
+    cibles sont interchangeables : une distribution canonique jouée avec une
+    permutation aléatoire des cibles a le même gain espéré contre toute
+    distribution adverse de même forme canonique. L'espace est ainsi réduit
+    d'un facteur allant jusqu'à size!.
+    '''
+
+    def __init__(self, limit, size):
+        '''
+        :param limit (int)
+            borne supérieure de la somme
+        :param size (int)
+            taille des distributions
+        '''
+        self.limit = limit
+        self.size = size
+
+    def __iter__(self):
+        '''
+        énumère les formes canoniques (ordre lexicographique croissant)
+        '''
+        def partitions(limit, size, high):
+            if size == 0:
+                yield ()
+                return
+            for x in range(min(limit, high) + 1):
+                for p in partitions(limit - x, size - 1, x):
+                    yield (x,) + p
+        yield from partitions(self.limit, self.size, self.limit)
+
+
+def lift(p):
+    '''
+    :param p (tuple)
+        forme canonique
+    :return (tuple)
+        distribution concrète obtenue par une permutation aléatoire des
+        cibles
+    '''
+    return tuple(int(x) for x in np.random.permutation(p))
+
+
+def expected_wins(parts, r):
+    '''
+    :param parts (np.array)
+        tableau 2D de formes canoniques
+    :param r (list)
+        distribution adverse
+    :return (np.array)
+        nombre espéré de cibles gagnées par chaque forme canonique, jouée
+        avec une permutation aléatoire, contre r
+    '''
+    parts = np.asarray(parts)
+    r = np.asarray(r)
+    return (np.sum(parts[:, :, None] > r[None, None, :], axis=(1, 2)) /
+            parts.shape[1])
+
+
+def partition_wins(parts):
+    '''
+    :param parts (np.array)
+        tableau 2D de formes canoniques
+    :return (np.array)
+        matrice W telle que W[a, b] est le nombre espéré de cibles gagnées
+        par la forme a contre la forme b
+    '''
+    parts = np.asarray(parts)
+    return np.stack([expected_wins(parts, q) for q in parts], axis=1)
+
+
+def count(limit, size):
+    '''
+    :return (int)
+        nombre de formes canoniques de taille size dont la somme est bornée
+        à limit
+    '''
+    # p[n] : nombre de partitions de n en au plus k parts (k croissant)
+    p = [1] + [0] * limit
+    for k in range(1, size + 1):
+        for n in range(k, limit + 1):
+            p[n] += p[n - k]
+    return sum(p)
@@ -0,0 +1,6 @@
+# -*- coding: utf-8 -*-
+import os
+import sys
+
+# les modules du projet s'importent depuis src (comme les scripts de jeu)
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
@@ -0,0 +1,27 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+
+from search.grid2D import ProblemeGrid2D
+from search.cache import PathCache
+
+
+def test_costs_are_part_of_the_version():
+    grid = np.ones((5,5), dtype=bool)
+    costs = np.ones((5,5), dtype=np.int64)
+    costs[1:4,1:4] = 9
+    cache = PathCache()
+    plain = cache.astar(ProblemeGrid2D((2,0),(2,4),grid,'manhattan'))
+    weighted = cache.astar(ProblemeGrid2D((2,0),(2,4),grid,'manhattan',
+                                          costs=costs))
+    assert cache.info()['hits'] == 0
+    assert len(plain) == 5
+    assert all(costs[e] == 1 for e in weighted)
+
+
+def test_same_problem_is_served_from_cache():
+    grid = np.ones((5,5), dtype=bool)
+    cache = PathCache()
+    first = cache.astar(ProblemeGrid2D((0,0),(4,4),grid,'manhattan'))
+    second = cache.astar(ProblemeGrid2D((0,0),(4,4),grid,'manhattan'))
+    assert second is first
+    assert cache.info()['hits'] == 1
@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+import json
+import os
+
+import numpy as np
+
+from search.grid2D import ProblemeGrid2D
+from search import grid_astar
+from search.fields import dial_field
+from search.hierarchical import HierarchicalPlanner, sector_labels
+
+
+CARTE = os.path.join(os.path.dirname(__file__), '..', 'src', 'pySpriteWorld',
+                     'Cartes', 'blottoMap.json')
+
+
+def _blotto_grid():
+    with open(CARTE) as carte_file:
+        carte = json.load(carte_file)
+    layer = [l for l in carte['layers'] if l['name'] == 'obstacles'][0]
+    data = np.array(layer['data']).reshape(carte['height'], carte['width'])
+    return data == 0
+
+
+def _queries(grid, n, seed=0):
+    rng = np.random.default_rng(seed)
+    free = np.argwhere(grid)
+    for _ in range(n):
+        (a,b) = free[rng.integers(len(free), size=2)]
+        yield (int(a[0]),int(a[1])), (int(b[0]),int(b[1]))
+
+
+def _check_path(path, grid, init, but):
+    cells = list(path)
+    assert cells[0] == init and cells[-1] == but
+    for (p,q) in zip(cells, cells[1:]):
+        assert abs(p[0]-q[0]) + abs(p[1]-q[1]) == 1 and grid[q]
+    return cells
+
+
+def test_sectors_follow_the_walls():
+    grid = _blotto_grid()
+    labels, nb_labels = sector_labels(grid)
+    assert nb_labels == 12
+    # les trois pièces du haut sont des secteurs distincts
+    assert len({labels[2,3], labels[2,10], labels[2,15]}) == 3
+
+
+def test_paths_are_as_short_as_grid_astar():
+    grid = _blotto_grid()
+    planner = HierarchicalPlanner(grid)
+    queries = [((5,9),(5,10)), ((14,10),(14,9))] + list(_queries(grid, 300))
+    for (init,but) in queries:
+        expected = grid_astar.astar(ProblemeGrid2D(init,but,grid,'manhattan'))
+        path = planner.path(init, but)
+        cells = _check_path(path, grid, init, but)
+        assert len(cells) == len(expected)
+        assert path.cost == len(expected) - 1
+
+
+def test_weighted_paths_are_optimal():
+    grid = _blotto_grid()
+    costs = np.random.default_rng(1).integers(1, 5, grid.shape)
+    planner = HierarchicalPlanner(grid, costs=costs)
+    for (init,but) in _queries(grid, 100, seed=2):
+        path = planner.path(init, but)
+        cells = _check_path(path, grid, init, but)
+        assert sum(costs[c] for c in cells[1:]) == path.cost
+        assert path.cost == dial_field(grid, costs, but, reverse=True)[init]
+
+
+def test_unreachable_goal():
+    grid = np.ones((6,6), dtype=bool)
+    grid[:,2] = False
+    path = HierarchicalPlanner(grid).path((0,0), (0,5))
+    assert list(path) == [(0,0)] and path.cost == float('inf')
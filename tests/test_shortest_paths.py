@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+import json
+import os
+
+import numpy as np
+
+from search.fields import distance_field
+from search.shortest_paths import load_shortest_paths
+
+
+def _grid():
+    grid = np.ones((6,6), dtype=bool)
+    grid[1:5,3] = False
+    return grid
+
+
+def _check(table, grid):
+    for (x,y) in zip(*grid.nonzero()):
+        field = distance_field(grid, (int(x),int(y)))
+        for (u,v) in zip(*grid.nonzero()):
+            assert table.distance((x,y),(u,v)) == field[u,v]
+
+
+def test_table_is_saved_then_memory_mapped(tmp_path):
+    grid = _grid()
+    load_shortest_paths(grid, 'carte', str(tmp_path))
+    assert sorted(os.listdir(tmp_path)) == ['shortest_paths_carte.json',
+                                           'shortest_paths_carte.npy']
+    table = load_shortest_paths(grid, 'carte', str(tmp_path))
+    assert isinstance(table.matrix, np.memmap)
+    _check(table, grid)
+
+
+def test_truncated_table_is_rebuilt(tmp_path):
+    grid = _grid()
+    load_shortest_paths(grid, 'carte', str(tmp_path))
+    path = tmp_path / 'shortest_paths_carte.npy'
+    path.write_bytes(path.read_bytes()[:200])
+    _check(load_shortest_paths(grid, 'carte', str(tmp_path)), grid)
+
+
+def test_table_of_another_grid_is_rebuilt(tmp_path):
+    other = _grid()
+    other[1:5,3] = True
+    other[1:5,2] = False
+    load_shortest_paths(other, 'carte', str(tmp_path))
+    grid = _grid()
+    _check(load_shortest_paths(grid, 'carte', str(tmp_path)), grid)
+    with open(tmp_path / 'shortest_paths_carte.json') as meta_file:
+        assert json.load(meta_file)['dtype'] == np.dtype(np.uint16).str
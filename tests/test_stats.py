@@ -0,0 +1,19 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+
+from stats import StrategyStats
+
+
+def test_distribs_grow_with_the_observations():
+    stats = StrategyStats(capacity=2)
+    rng = np.random.default_rng(0)
+    seen = [tuple(int(x) for x in rng.integers(0, 4, 3)) for _ in range(20)]
+    for r in seen:
+        stats.add(r)
+    distinct = list(dict.fromkeys(seen))
+    assert stats.get_distribs().tolist() == [list(r) for r in distinct]
+    assert stats.get_counts().tolist() == [seen.count(r) for r in distinct]
+
+
+def test_no_distribution_observed():
+    assert len(StrategyStats().get_distribs()) == 0